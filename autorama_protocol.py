@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+📡 Protocolo Serial - Autorama LED Race Game
+Codec dos quadros binários e parser das linhas de texto emitidos pelo firmware
+(src/Race.ino). Todos os eventos usam o número do carro como impresso pelo
+firmware (1-based); quem indexa listas converte com car - 1.
+
+Formato do quadro (little-endian, tamanho fixo para N carros):
+
+    offset  bytes  campo
+    0       2      sincronismo 0xAA 0x55
+    2       1      versão do formato
+    3       1      número de carros (N)
+    4       2      sequência (u16, dá a volta em 65535)
+    6       4      millis() do ESP32 (u32)
+    10      1      flags (bit 0 = corrida ativa)
+    11      1      vencedor (número do carro, 0 = sem vencedor)
+    12      6*N    por carro: posição u16 e velocidade u16 em centésimos,
+                   voltas u8, reservado u8
+    12+6N   2      CRC-16/CCITT-FALSE dos bytes [2, 12+6N)
+
+O quadro sempre começa no início de uma linha. Como 0xAA nunca inicia um
+caractere UTF-8, o decodificador separa quadros e linhas de texto no mesmo
+fluxo sem ambiguidade.
+"""
+
+import re
+import struct
+from binascii import crc_hqx
+from typing import List, NamedTuple, Tuple
+
+FRAME_SYNC = b'\xaa\x55'
+FRAME_VERSION = 1
+FLAG_RACE_ACTIVE = 0x01
+MAX_CARS = 16  # Limite de carros por pista (e por quadro)
+
+_HEADER = struct.Struct('<2sBBHIBB')
+_CAR = struct.Struct('<HHBx')
+_CRC = struct.Struct('<H')
+_CRC_INIT = 0xFFFF
+_MAX_LINE = 4096  # Linhas maiores que isso são descartadas (ruído)
+_COMPACT_AT = 16384  # Bytes consumidos antes de compactar o buffer
+
+ECHO_PREFIX = '📡 Comando: '  # Eco impresso pelo firmware para cada caractere
+SETUP_DONE = '✅ Setup concluído!'  # Última linha do setup(): a placa passa a ler comandos
+
+
+class CarSample(NamedTuple):
+    """Amostra de um carro dentro de um quadro (car é 1-based)"""
+    car: int
+    position: float
+    speed: float
+    laps: int
+
+
+class TelemetryFrame(NamedTuple):
+    """Quadro de telemetria com o estado de todos os carros"""
+    seq: int
+    millis: int
+    race_active: bool
+    winner: int
+    cars: Tuple[CarSample, ...]
+
+
+def frame_size(num_cars):
+    """Tamanho em bytes de um quadro com num_cars carros"""
+    return _HEADER.size + _CAR.size * num_cars + _CRC.size
+
+
+def encode_frame(frame):
+    """Codifica um TelemetryFrame (usado por simuladores e testes de carga)"""
+    flags = FLAG_RACE_ACTIVE if frame.race_active else 0
+    body = bytearray(_HEADER.pack(
+        FRAME_SYNC, FRAME_VERSION, len(frame.cars),
+        frame.seq & 0xFFFF, frame.millis & 0xFFFFFFFF, flags, frame.winner
+    ))
+    for sample in frame.cars:
+        body += _CAR.pack(
+            int(round(sample.position * 100)),
+            int(round(sample.speed * 100)),
+            sample.laps & 0xFF
+        )
+    body += _CRC.pack(crc_hqx(body[2:], _CRC_INIT))
+    return bytes(body)
+
+
+def _decode_at(view, offset):
+    """Decodifica o quadro em view[offset:]
+
+    Retorna (quadro, tamanho), (None, 0) se faltam bytes ou (None, -1) se o
+    cabeçalho é inválido ou o CRC não confere.
+    """
+    if len(view) - offset < _HEADER.size:
+        return None, 0
+    _, version, num_cars, seq, millis, flags, winner = _HEADER.unpack_from(view, offset)
+    # Um número de carros corrompido não pode segurar o fluxo à espera de um quadro enorme
+    if version != FRAME_VERSION or not 1 <= num_cars <= MAX_CARS:
+        return None, -1
+    size = frame_size(num_cars)
+    if len(view) - offset < size:
+        return None, 0
+
+    crc_offset = offset + size - _CRC.size
+    (crc,) = _CRC.unpack_from(view, crc_offset)
+    if crc != crc_hqx(view[offset + 2:crc_offset], _CRC_INIT):
+        return None, -1
+
+    cars = tuple(
+        CarSample(index, position / 100.0, speed / 100.0, laps)
+        for index, (position, speed, laps) in enumerate(
+            _CAR.iter_unpack(view[offset + _HEADER.size:crc_offset]), start=1
+        )
+    )
+    return TelemetryFrame(seq, millis, bool(flags & FLAG_RACE_ACTIVE), winner, cars), size
+
+
+def decode_frames(buffer):
+    """Decodifica todos os quadros completos de um buffer de uma vez
+
+    Bytes que não formam um quadro válido são pulados até o próximo
+    sincronismo. Retorna (quadros, bytes consumidos); o restante do buffer é
+    um quadro incompleto que deve ser completado com a próxima leitura.
+    """
+    view = memoryview(buffer)
+    frames = []
+    offset = 0
+    while True:
+        offset = buffer.find(FRAME_SYNC, offset)
+        if offset < 0:
+            # Manter um possível primeiro byte de sincronismo no fim do buffer
+            tail = len(buffer) - 1 if buffer[-1:] == FRAME_SYNC[:1] else len(buffer)
+            return frames, tail
+        frame, size = _decode_at(view, offset)
+        if size == 0:
+            return frames, offset
+        if size < 0:
+            offset += 1
+            continue
+        frames.append(frame)
+        offset += size
+
+
+class StreamDecoder:
+    """Separa o fluxo serial em linhas de texto e quadros binários
+
+    Os bytes recebidos são acumulados em um único bytearray reaproveitado
+    entre leituras. Linhas são decodificadas direto de fatias de memoryview,
+    sem cópias intermediárias, e o buffer só é compactado quando a parte já
+    consumida passa de _COMPACT_AT bytes.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._start = 0
+        self.dropped_bytes = 0
+
+    def feed(self, data):
+        """Adiciona bytes recebidos e retorna (linhas, quadros) completos"""
+        buffer = self._buffer
+        if self._start >= _COMPACT_AT or self._start == len(buffer):
+            del buffer[:self._start]
+            self._start = 0
+        buffer += data
+
+        lines: List[str] = []
+        frames: List[TelemetryFrame] = []
+        offset = self._start
+        end = len(buffer)
+        find = buffer.find
+        sync0 = FRAME_SYNC[0]
+
+        with memoryview(buffer) as view:
+            while offset < end:
+                if buffer[offset] == sync0:
+                    if end - offset < len(FRAME_SYNC):
+                        break
+                    if buffer[offset + 1] == FRAME_SYNC[1]:
+                        frame, size = _decode_at(view, offset)
+                        if size == 0:
+                            break
+                        if size > 0:
+                            frames.append(frame)
+                            offset += size
+                            continue
+                    # Sincronismo falso, cabeçalho corrompido ou CRC errado: o
+                    # tamanho anunciado não é confiável, então só o sincronismo é
+                    # descartado e a busca recomeça no próximo registro (quebra
+                    # de linha ou sincronismo)
+                    resync = self._next_record(buffer, offset + 1)
+                    if resync < 0:
+                        self.dropped_bytes += end - offset
+                        offset = end
+                        break
+                    self.dropped_bytes += resync - offset
+                    offset = resync
+                    continue
+
+                newline = find(b'\n', offset)
+                if newline < 0:
+                    if end - offset > _MAX_LINE:
+                        self.dropped_bytes += end - offset
+                        offset = end
+                    break
+                if find(0, offset, newline) >= 0:
+                    # O firmware não imprime NUL: resto de um quadro rejeitado
+                    self.dropped_bytes += newline + 1 - offset
+                    offset = newline + 1
+                    continue
+                line = str(view[offset:newline], 'utf-8', 'replace').strip()
+                if line:
+                    lines.append(line)
+                offset = newline + 1
+
+        self._start = offset
+        return lines, frames
+
+    @staticmethod
+    def _next_record(buffer, start):
+        """Posição do próximo início de registro a partir de start"""
+        newline = buffer.find(b'\n', start)
+        sync = buffer.find(FRAME_SYNC, start)
+        if newline >= 0:
+            newline += 1
+        candidates = [position for position in (newline, sync) if position >= 0]
+        return min(candidates) if candidates else -1
+
+
+# ===== EVENTOS DAS LINHAS DE TEXTO =====
+
+class CommandEcho(NamedTuple):
+    """📡 Comando: a"""
+    command: str
+
+
+class UnknownCommand(NamedTuple):
+    """❓ Comando desconhecido: x"""
+    command: str
+
+
+class RaceStarted(NamedTuple):
+    """🏁 GO - Iniciando corrida!"""
+
+
+class RaceGoal(NamedTuple):
+    """🎯 Meta: 5 voltas para vencer!"""
+    total_laps: int
+
+
+class RaceReset(NamedTuple):
+    """🔄 RESET - Parando corrida!"""
+
+
+class RaceFinished(NamedTuple):
+    """🎉🎉🎉 CORRIDA TERMINOU! 🎉🎉🎉"""
+
+
+class Winner(NamedTuple):
+    """🏆 VENCEDOR: Carro 2!"""
+    car: int
+
+
+class LapCompleted(NamedTuple):
+    """🏁 Carro 1 completou volta 2/5 - Velocidade: 3.20"""
+    car: int
+    lap: int
+    total_laps: int
+    speed: float
+
+
+class CarAccelerated(NamedTuple):
+    """🚗 Carro 1 (Vermelho) acelerando!"""
+    car: int
+
+
+class SpeedChanged(NamedTuple):
+    """Nova velocidade: 0.50 (car vem da última aceleração, 0 se desconhecido)"""
+    car: int
+    speed: float
+
+
+class RaceStatus(NamedTuple):
+    """Corrida: ATIVA (bloco de status)"""
+    active: bool
+
+
+class CarStatus(NamedTuple):
+    """Carro 1: Vel=0.00, Pos=0.00, Voltas=0/5 (bloco de status)"""
+    car: int
+    speed: float
+    position: float
+    laps: int
+    total_laps: int
+
+
+class CarPosition(NamedTuple):
+    """Carro 1 na posição 37 (comando VIEW)"""
+    car: int
+    position: int
+
+
+class LegacyTelemetry(NamedTuple):
+    """p1T1,50,100 (carro, volta, posição, bateria)"""
+    car: int
+    lap: int
+    position: int
+    battery: int
+
+
+class SetupComplete(NamedTuple):
+    """✅ Setup concluído!"""
+
+
+class LogLine(NamedTuple):
+    """Qualquer outra linha do firmware"""
+    text: str
+
+
+_LAP = re.compile(r'🏁 Carro (\d+) completou volta (\d+)/(\d+) - Velocidade: (-?[\d.]+)')
+_WINNER = re.compile(r'🏆 VENCEDOR: Carro (\d+)')
+_ACCELERATED = re.compile(r'🚗 Carro (\d+) ')
+_GOAL = re.compile(r'🎯 Meta: (\d+)')
+_CAR_STATUS = re.compile(
+    r'Carro (\d+): Vel=(-?[\d.]+), Pos=(-?[\d.]+), Voltas=(\d+)/(\d+)'
+)
+_CAR_POSITION = re.compile(r'Carro (\d+) na posição (-?\d+)')
+_SPEED = re.compile(r'Nova velocidade: (-?[\d.]+)')
+_LEGACY = re.compile(r'p(\d+)T(\d+),(-?\d+),(-?\d+)')
+
+_UNKNOWN_PREFIX = '❓ Comando desconhecido: '
+_GO_PREFIX = '🏁 GO'
+_RESET_PREFIX = '🔄 RESET'
+_FINISHED_PREFIX = '🎉'
+_RACE_STATUS_PREFIX = 'Corrida: '
+
+
+class LineParser:
+    """Classifica linhas do firmware em eventos tipados em uma única passada
+
+    O primeiro caractere da linha seleciona o tratador na tabela de despacho;
+    cada tratador aplica no máximo um ou dois padrões pré-compilados. A única
+    informação guardada entre linhas é o último carro acelerado, usado para
+    atribuir a linha "Nova velocidade" que o firmware imprime em seguida.
+    """
+
+    def __init__(self):
+        self._last_accelerated = 0
+        self._dispatch = {
+            '📡': self._echo,
+            '🏁': self._flag,
+            '🏆': self._winner,
+            '🎉': self._finished,
+            '🔄': self._reset,
+            '🚗': self._accelerated,
+            '🎯': self._goal,
+            '❓': self._unknown,
+            '✅': self._check,
+            'C': self._car,
+            'N': self._speed,
+            'p': self._legacy,
+        }
+
+    def parse(self, line):
+        """Converte uma linha (já sem espaços nas pontas) em evento"""
+        if not line:
+            return LogLine(line)
+        handler = self._dispatch.get(line[0])
+        if handler is None:
+            return LogLine(line)
+        # Eventos sem campos são tuplas vazias (falsas): comparar com None
+        event = handler(line)
+        return LogLine(line) if event is None else event
+
+    def parse_batch(self, records):
+        """Converte um lote do leitor serial; quadros binários passam direto"""
+        parse = self.parse
+        return [record if isinstance(record, TelemetryFrame) else parse(record)
+                for record in records]
+
+    @staticmethod
+    def _echo(line):
+        if line.startswith(ECHO_PREFIX):
+            return CommandEcho(line[len(ECHO_PREFIX):])
+        return None
+
+    @staticmethod
+    def _flag(line):
+        if line.startswith(_GO_PREFIX):
+            return RaceStarted()
+        match = _LAP.match(line)
+        if match:
+            car, lap, total, speed = match.groups()
+            return LapCompleted(int(car), int(lap), int(total), float(speed))
+        return None
+
+    @staticmethod
+    def _winner(line):
+        match = _WINNER.match(line)
+        return Winner(int(match.group(1))) if match else None
+
+    @staticmethod
+    def _finished(line):
+        return RaceFinished() if line.startswith(_FINISHED_PREFIX) else None
+
+    @staticmethod
+    def _reset(line):
+        return RaceReset() if line.startswith(_RESET_PREFIX) else None
+
+    def _accelerated(self, line):
+        match = _ACCELERATED.match(line)
+        if not match:
+            return None
+        self._last_accelerated = int(match.group(1))
+        return CarAccelerated(self._last_accelerated)
+
+    @staticmethod
+    def _goal(line):
+        match = _GOAL.match(line)
+        return RaceGoal(int(match.group(1))) if match else None
+
+    @staticmethod
+    def _unknown(line):
+        if line.startswith(_UNKNOWN_PREFIX):
+            return UnknownCommand(line[len(_UNKNOWN_PREFIX):])
+        return None
+
+    @staticmethod
+    def _check(line):
+        return SetupComplete() if line == SETUP_DONE else None
+
+    @staticmethod
+    def _car(line):
+        if line.startswith(_RACE_STATUS_PREFIX):
+            return RaceStatus(line[len(_RACE_STATUS_PREFIX):] == 'ATIVA')
+        match = _CAR_STATUS.match(line)
+        if match:
+            car, speed, position, laps, total = match.groups()
+            return CarStatus(int(car), float(speed), float(position), int(laps), int(total))
+        match = _CAR_POSITION.match(line)
+        if match:
+            return CarPosition(int(match.group(1)), int(match.group(2)))
+        return None
+
+    def _speed(self, line):
+        match = _SPEED.match(line)
+        if not match:
+            return None
+        return SpeedChanged(self._last_accelerated, float(match.group(1)))
+
+    @staticmethod
+    def _legacy(line):
+        match = _LEGACY.match(line)
+        if not match:
+            return None
+        car, lap, position, battery = match.groups()
+        return LegacyTelemetry(int(car), int(lap), int(position), int(battery))
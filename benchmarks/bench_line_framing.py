@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+📊 Benchmark de Enquadramento Serial - Autorama LED Race Game
+Compara a leitura antiga (in_waiting + readline por linha + sleep) com a
+leitura em bloco (read(max(1, in_waiting)) + StreamDecoder) repetindo tráfego
+no estilo do autorama_server.log através de um pseudo-terminal.
+
+Uso: python benchmarks/bench_line_framing.py [--lines 800] [--burst-interval 0.01]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import tty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serial
+
+from autorama_protocol import StreamDecoder
+
+# Rajadas típicas do firmware para cada comando (ver autorama_server.log)
+FIRMWARE_BURSTS = [
+    ["📡 Comando: g", "🏁 GO - Iniciando corrida!", "🎯 Meta: 5 voltas para vencer!"],
+    ["📡 Comando: a", "🚗 Carro 1 (Vermelho) acelerando!", "  Nova velocidade: 0.50"],
+    ["📡 Comando: 2", "🚗 Carro 2 (Verde) acelerando!", "  Nova velocidade: 0.50"],
+    ["📡 Comando: d", "🚗 Carro 3 (Azul) acelerando!", "  Nova velocidade: 1.00"],
+    ["📡 Comando: f", "🚗 Carro 4 (Amarelo) acelerando!", "  Nova velocidade: 1.50"],
+    ["🏁 Carro 1 completou volta 1/5 - Velocidade: 2.40"],
+    ["📡 Comando: s", "📊 STATUS:", "  Corrida: ATIVA",
+     "  Carro 1: Vel=2.40, Pos=12.50, Voltas=1/5",
+     "  Carro 2: Vel=0.40, Pos=88.10, Voltas=0/5",
+     "  Carro 3: Vel=0.90, Pos=140.00, Voltas=0/5",
+     "  Carro 4: Vel=1.40, Pos=61.30, Voltas=0/5"],
+    ["📡 Comando: a", "🚗 Carro 1 (Vermelho) acelerando!", "  Nova velocidade: 2.90"],
+]
+
+
+class CountingSerial(serial.Serial):
+    """Serial que conta chamadas de read() e consultas a in_waiting"""
+
+    reads = 0
+    polls = 0
+
+    def read(self, size=1):
+        self.reads += 1
+        return super().read(size)
+
+    @property
+    def in_waiting(self):
+        self.polls += 1
+        return serial.Serial.in_waiting.fget(self)
+
+
+def build_traffic(total_lines):
+    """Monta as rajadas até completar total_lines linhas"""
+    bursts = []
+    count = 0
+    index = 0
+    while count < total_lines:
+        burst = FIRMWARE_BURSTS[index % len(FIRMWARE_BURSTS)][:total_lines - count]
+        bursts.append(burst)
+        count += len(burst)
+        index += 1
+    return bursts
+
+
+def legacy_reader(ser, total, received, poll_interval):
+    """Padrão antigo: in_waiting, readline() por linha e sleep entre verificações"""
+    while len(received) < total:
+        if ser.in_waiting:
+            while ser.in_waiting:
+                line = ser.readline().decode('utf-8').strip()
+                if line:
+                    received.append(time.perf_counter())
+        time.sleep(poll_interval)
+
+
+def bulk_reader(ser, total, received, poll_interval):
+    """Padrão novo: bloqueia em read(max(1, in_waiting)) e separa o lote"""
+    decoder = StreamDecoder()
+    while len(received) < total:
+        data = ser.read(max(1, ser.in_waiting))
+        if not data:
+            continue
+        lines, _ = decoder.feed(data)
+        if lines:
+            now = time.perf_counter()
+            received.extend([now] * len(lines))
+
+
+def run(reader, bursts, burst_interval, poll_interval):
+    """Executa um leitor contra o tráfego gravado e retorna as métricas"""
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    ser = CountingSerial(os.ttyname(slave), baudrate=115200, timeout=0.1)
+    total = sum(len(burst) for burst in bursts)
+    sent = []
+    received = []
+    cpu = {}
+
+    def read_all():
+        start = time.thread_time()
+        reader(ser, total, received, poll_interval)
+        cpu['seconds'] = time.thread_time() - start
+
+    thread = threading.Thread(target=read_all)
+    thread.start()
+    started = time.perf_counter()
+    for burst in bursts:
+        payload = ''.join(f"{line}\r\n" for line in burst).encode('utf-8')
+        now = time.perf_counter()
+        os.write(master, payload)
+        sent.extend([now] * len(burst))
+        time.sleep(burst_interval)
+    thread.join()
+    elapsed = time.perf_counter() - started
+
+    ser.close()
+    os.close(master)
+    os.close(slave)
+
+    latencies = sorted((r - s) * 1000 for r, s in zip(received, sent))
+    return {
+        'lines': len(received),
+        'reads': ser.reads,
+        'polls': ser.polls,
+        'cpu_ms': cpu['seconds'] * 1000,
+        'elapsed_s': elapsed,
+        'lat_mean_ms': statistics.mean(latencies),
+        'lat_p50_ms': latencies[len(latencies) // 2],
+        'lat_p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'lat_max_ms': latencies[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=800, help='linhas a repetir')
+    parser.add_argument('--burst-interval', type=float, default=0.01,
+                        help='intervalo entre rajadas do firmware (s)')
+    parser.add_argument('--poll-interval', type=float, default=0.1,
+                        help='sleep do leitor antigo entre verificações (s)')
+    args = parser.parse_args()
+
+    bursts = build_traffic(args.lines)
+    print(f"📊 {args.lines} linhas em {len(bursts)} rajadas a cada "
+          f"{args.burst_interval * 1000:.0f} ms")
+    print(f"{'leitor':<10}{'linhas':>8}{'read()':>9}{'in_wait':>9}{'CPU ms':>9}"
+          f"{'média ms':>10}{'p50 ms':>9}{'p99 ms':>9}{'máx ms':>9}")
+
+    for name, reader in (('readline', legacy_reader), ('bloco', bulk_reader)):
+        result = run(reader, bursts, args.burst_interval, args.poll_interval)
+        print(f"{name:<10}{result['lines']:>8}{result['reads']:>9}{result['polls']:>9}"
+              f"{result['cpu_ms']:>9.1f}{result['lat_mean_ms']:>10.2f}"
+              f"{result['lat_p50_ms']:>9.2f}{result['lat_p99_ms']:>9.2f}"
+              f"{result['lat_max_ms']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+📊 Benchmark do Logging - Autorama LED Race Game
+Compara o custo de logging por requisição de comando no modo síncrono antigo
+(FileHandler + StreamHandler na thread da requisição) com o log_pipeline:
+só a fila com a thread de escrita, e a fila com o limite de taxa.
+
+Cada "requisição" emite as linhas de um POST /api/command: "Enviando
+comando", "Resposta recebida" e a linha de acesso do werkzeug. Vários
+jogadores logam em paralelo; mede-se o tempo gasto nas chamadas de log dentro
+da requisição (p50/p99) e o tamanho final do arquivo.
+
+Uso: python benchmarks/bench_logging.py [--players 4] [--requests 5000] [--console-delay 0.05]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import LOG_FORMAT, pipeline_stats, setup_logging, stop_logging
+
+CAR_COMMANDS = ['a', '2', 'd', 'f']
+
+
+class SlowConsole:
+    """Terminal simulado: cada escrita custa delay milissegundos"""
+
+    def __init__(self, delay_ms):
+        self.delay = delay_ms / 1000
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def setup_sync(path, console):
+    """Configuração antiga: basicConfig com arquivo e terminal"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        handlers=[logging.FileHandler(path), logging.StreamHandler(console)],
+    )
+
+
+def player(car, requests, durations):
+    """Emite as linhas de log de requests comandos e mede o custo de cada um"""
+    logger = logging.getLogger('web_server_robust')
+    access = logging.getLogger('werkzeug')
+    command = CAR_COMMANDS[car % len(CAR_COMMANDS)]
+    timer = time.perf_counter
+    for _ in range(requests):
+        started = timer()
+        logger.info("Enviando comando: %s", command)
+        logger.info("Resposta recebida: %s", f"📡 Comando: {command}")
+        access.info('%s - - [%s] "%s" %s %s', '127.0.0.1', '18/Oct/2026 11:00:00',
+                    'POST /api/command HTTP/1.1', '200', '-')
+        durations.append(timer() - started)
+
+
+def run(mode, args, workdir):
+    path = os.path.join(workdir, f'{mode}.log')
+    console = SlowConsole(args.console_delay)
+    if mode == 'síncrono':
+        setup_sync(path, console)
+    else:
+        setup_logging(path, stream=console, rate_limit=mode == 'fila+limite')
+    logging.getLogger('werkzeug').setLevel(logging.INFO)
+
+    durations = []
+    threads = [threading.Thread(target=player, args=(i, args.requests, durations))
+               for i in range(args.players)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stats = pipeline_stats()
+    stop_logging()  # Esvazia a fila antes de medir o arquivo
+    for handler in logging.getLogger().handlers:
+        handler.close()
+
+    durations.sort()
+    size = sum(os.path.getsize(os.path.join(workdir, name))
+               for name in os.listdir(workdir) if name.startswith(mode))
+    return {
+        'p50': durations[len(durations) // 2] * 1e6,
+        'p99': durations[int(len(durations) * 0.99)] * 1e6,
+        'requests_per_s': len(durations) / elapsed,
+        'log_kb': size / 1024,
+        'console_writes': console.writes,
+        'suppressed': stats['suppressed'],
+        'dropped': stats['dropped'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=4, help='threads emitindo comandos')
+    parser.add_argument('--requests', type=int, default=5000, help='comandos por jogador')
+    parser.add_argument('--console-delay', type=float, default=0.05,
+                        help='custo de cada escrita no terminal (ms)')
+    args = parser.parse_args()
+
+    print(f"📊 {args.players} jogadores × {args.requests} comandos, "
+          f"terminal a {args.console_delay} ms/escrita")
+    print(f"{'modo':<12}{'p50 µs':>10}{'p99 µs':>10}{'req/s':>12}{'log KB':>10}"
+          f"{'terminal':>10}{'suprimidas':>12}{'descartadas':>13}")
+    with tempfile.TemporaryDirectory(prefix='autorama-log-') as workdir:
+        for mode in ('síncrono', 'fila', 'fila+limite'):
+            result = run(mode, args, workdir)
+            print(f"{mode:<12}{result['p50']:>10.1f}{result['p99']:>10.1f}"
+                  f"{result['requests_per_s']:>12,.0f}{result['log_kb']:>10.0f}"
+                  f"{result['console_writes']:>10}{result['suppressed']:>12}{result['dropped']:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+📊 Benchmark do Parser de Protocolo - Autorama LED Race Game
+Mede quantas linhas por segundo o LineParser classifica, para um corpus misto
+no estilo do firmware (Race.ino) e para cada tipo de linha isoladamente.
+
+Uso: python benchmarks/bench_protocol.py [--lines 200000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autorama_protocol import LineParser
+
+# Uma linha representativa de cada mensagem que o firmware imprime
+SAMPLES = {
+    'eco': "📡 Comando: a",
+    'go': "🏁 GO - Iniciando corrida!",
+    'meta': "🎯 Meta: 5 voltas para vencer!",
+    'aceleração': "🚗 Carro 1 (Vermelho) acelerando!",
+    'velocidade': "Nova velocidade: 0.50",
+    'volta': "🏁 Carro 1 completou volta 1/5 - Velocidade: 2.40",
+    'vencedor': "🏆 VENCEDOR: Carro 3 (Azul)!",
+    'fim': "🎉 Corrida finalizada!",
+    'status': "Carro 2: Vel=0.40, Pos=88.10, Voltas=0/5",
+    'legado': "p1T1,50,100",
+    'log': "📊 STATUS:",
+}
+
+# Proporção aproximada de cada linha durante uma corrida
+MIX = {
+    'eco': 30, 'aceleração': 25, 'velocidade': 25, 'status': 8, 'volta': 4,
+    'legado': 4, 'log': 2, 'go': 1, 'meta': 1, 'vencedor': 1, 'fim': 1,
+}
+
+
+def build_corpus(total, mix):
+    """Repete as linhas de exemplo na proporção pedida até total linhas"""
+    pattern = [SAMPLES[name] for name, weight in mix.items() for _ in range(weight)]
+    return (pattern * (total // len(pattern) + 1))[:total]
+
+
+def measure(lines, repeat):
+    """Melhor taxa (linhas/s) entre as repetições, usando parse_batch"""
+    best = 0.0
+    for _ in range(repeat):
+        parser = LineParser()
+        start = time.perf_counter()
+        parser.parse_batch(lines)
+        elapsed = time.perf_counter() - start
+        best = max(best, len(lines) / elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000, help='linhas por rodada')
+    parser.add_argument('--repeat', type=int, default=5, help='rodadas por medição')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.lines, MIX)
+    kinds = Counter(type(event).__name__ for event in LineParser().parse_batch(corpus))
+    print(f"📊 {args.lines} linhas, melhor de {args.repeat} rodadas")
+    print(f"   eventos no corpus: {', '.join(f'{k}={v}' for k, v in kinds.most_common())}")
+    print(f"{'corpus':<14}{'linhas/s':>14}{'ns/linha':>10}")
+
+    rate = measure(corpus, args.repeat)
+    print(f"{'misto':<14}{rate:>14,.0f}{1e9 / rate:>10.0f}")
+    for name, line in SAMPLES.items():
+        rate = measure([line] * args.lines, args.repeat)
+        print(f"{name:<14}{rate:>14,.0f}{1e9 / rate:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
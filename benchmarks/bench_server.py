@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+📊 Benchmark de Ponta a Ponta do Servidor - Autorama LED Race Game
+Sobe o esp32_simulator.py e o web_server_robust.py em processos separados,
+conecta o servidor à placa simulada e dispara jogadores sintéticos
+(POST /api/command com as teclas dos carros) e espectadores (GET
+/api/status e /api/telemetry) em paralelo.
+
+Relata latência pressão→eco (p50/p95/p99), requisições/s por rota e bytes/s
+na serial, e grava tudo em JSON para comparar versões (--compare).
+
+Uso: python benchmarks/bench_server.py [--players 4] [--spectators 16] [--duration 20]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+CAR_COMMANDS = ['a', '2', 'd', 'f']
+
+
+class Client:
+    """Conexão HTTP persistente de um jogador ou espectador"""
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.connection.request(method, path, payload, headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            raise
+        return response.status, data
+
+
+def wait_until(check, timeout, message):
+    """Espera check() ficar verdadeiro ou aborta o benchmark"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f"❌ {message}")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def player(port, car, rate, stop, latencies, totals):
+    """Pressiona o acelerador de um carro na taxa pedida e mede o eco"""
+    client = Client(port)
+    counters = Counter()
+    command = CAR_COMMANDS[car % len(CAR_COMMANDS)]
+    interval = 1.0 / rate
+    next_press = time.perf_counter()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            status, data = client.request('POST', '/api/command', {'command': command})
+        except (OSError, http.client.HTTPException):
+            counters['errors'] += 1
+            stop.wait(0.1)
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        counters['/api/command'] += 1
+        response = json.loads(data).get('response') if status == 200 else None
+        if response and response.startswith('📡'):
+            latencies.append(elapsed)
+        else:
+            counters['no_echo'] += 1
+        next_press += interval
+        delay = next_press - time.perf_counter()
+        if delay > 0:
+            stop.wait(delay)
+        else:
+            next_press = time.perf_counter()
+    totals.append(counters)
+
+
+def spectator(port, interval, stop, totals):
+    """Consulta status e telemetria como um painel em polling"""
+    client = Client(port)
+    counters = Counter()
+    paths = ('/api/status', '/api/telemetry')
+    turn = 0
+    while not stop.is_set():
+        path = paths[turn % 2]
+        turn += 1
+        try:
+            client.request('GET', path)
+            counters[path] += 1
+        except (OSError, http.client.HTTPException):
+            counters['errors'] += 1
+        if interval:
+            stop.wait(interval)
+    totals.append(counters)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    """Executa o cenário e retorna o dicionário de resultados"""
+    workdir = tempfile.mkdtemp(prefix='autorama-bench-')
+    # O servidor roda na pasta temporária para não sujar o autorama_server.log do projeto
+    os.symlink(os.path.join(ROOT, 'web_interface.html'), os.path.join(workdir, 'web_interface.html'))
+    link = os.path.join(workdir, 'esp32')
+
+    simulator = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'esp32_simulator.py'), '--no-boot',
+         '--link', link, '--laps', str(args.laps)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'web_server_robust.py')],
+        cwd=workdir, env=dict(os.environ, AUTORAMA_PORT=str(args.port)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        control = Client(args.port)
+        wait_until(lambda: os.path.exists(link), 10, "Simulador não iniciou")
+        wait_until(lambda: control.request('GET', '/api/test')[0] == 200, 20, "Servidor não iniciou")
+        status, data = control.request('POST', '/api/connect', {'port': link})
+        if status != 200:
+            raise SystemExit(f"❌ Falha ao conectar: {data.decode()}")
+        control.request('POST', '/api/command', {'command': 'g'})
+
+        stop = threading.Event()
+        latencies = []
+        totals = []  # Um Counter por thread, somados no fim
+        threads = [
+            threading.Thread(target=player, args=(args.port, i, args.press_rate, stop, latencies, totals))
+            for i in range(args.players)
+        ] + [
+            threading.Thread(target=spectator, args=(args.port, args.poll_interval, stop, totals))
+            for _ in range(args.spectators)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        counters = sum(totals, Counter())
+        control.request('POST', '/api/disconnect', {})
+    finally:
+        server.send_signal(signal.SIGINT)
+        simulator.send_signal(signal.SIGINT)
+        simulator_output, _ = simulator.communicate(timeout=10)
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    serial_bytes = {'to_board': 0, 'from_board': 0}
+    for line in simulator_output.splitlines():
+        if line.startswith('📊 Bytes:'):
+            fields = dict(item.split('=') for item in line.split(':', 1)[1].split())
+            serial_bytes = {'to_board': int(fields['recebidos']), 'from_board': int(fields['enviados'])}
+
+    requests_per_s = {path: round(counters[path] / elapsed, 1)
+                      for path in ('/api/command', '/api/status', '/api/telemetry')}
+    requests_per_s['total'] = round(sum(requests_per_s.values()), 1)
+    return {
+        'benchmark': 'bench_server',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'players': args.players, 'spectators': args.spectators,
+            'duration_s': args.duration, 'press_rate': args.press_rate,
+            'poll_interval_s': args.poll_interval,
+        },
+        'press_to_echo_ms': {
+            'count': len(latencies),
+            'mean': round(statistics.mean(latencies), 3) if latencies else None,
+            'p50': round(percentile(latencies, 0.50), 3) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 3) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 3) if latencies else None,
+            'max': round(max(latencies), 3) if latencies else None,
+        },
+        'requests_per_s': requests_per_s,
+        'no_echo': counters['no_echo'],
+        'errors': counters['errors'],
+        # Inclui o tráfego ocioso enquanto o servidor subia (telemetria a 2 Hz)
+        'serial_bytes_per_s': {key: round(value / elapsed, 1) for key, value in serial_bytes.items()},
+    }
+
+
+def print_results(results, previous=None):
+    """Resumo legível, com a variação em relação a uma execução anterior"""
+    def row(label, section, key, unit):
+        value = results[section][key]
+        line = f"  {label:<24}{value if value is not None else '-':>12} {unit}"
+        if previous and previous.get(section, {}).get(key):
+            old = previous[section][key]
+            line += f"   (antes {old}, {(value - old) / old * 100:+.1f}%)"
+        print(line)
+
+    config = results['config']
+    print(f"📊 {config['players']} jogadores a {config['press_rate']}/s, "
+          f"{config['spectators']} espectadores, {config['duration_s']} s")
+    for key in ('p50', 'p95', 'p99', 'max'):
+        row(f"pressão→eco {key}", 'press_to_echo_ms', key, 'ms')
+    for key in ('/api/command', '/api/status', '/api/telemetry', 'total'):
+        row(f"{key}", 'requests_per_s', key, 'req/s')
+    row("serial → placa", 'serial_bytes_per_s', 'to_board', 'B/s')
+    row("serial ← placa", 'serial_bytes_per_s', 'from_board', 'B/s')
+    print(f"  sem eco: {results['no_echo']}   erros: {results['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=4, help='jogadores sintéticos')
+    parser.add_argument('--spectators', type=int, default=16, help='painéis em polling')
+    parser.add_argument('--duration', type=float, default=20.0, help='duração da carga (s)')
+    parser.add_argument('--press-rate', type=float, default=10.0, help='pressões por segundo por jogador')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='intervalo dos espectadores (s)')
+    parser.add_argument('--laps', type=int, default=100000,
+                        help='voltas da corrida simulada (alto para a corrida não terminar)')
+    parser.add_argument('--port', type=int, default=8765, help='porta HTTP do servidor de teste')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: benchmarks/results/)')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    results = run(args)
+    previous = None
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+    print_results(results, previous)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench_server_{results['commit'] or 'local'}_{int(time.time())}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados em {output}")
+
+
+if __name__ == '__main__':
+    main()
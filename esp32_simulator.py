@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Simulador de ESP32 - Autorama LED Race Game
+Placas virtuais em pseudo-terminais que seguem src/Race.ino: mesmos comandos
+(g, a/2/d/f, r, t, s, c, v), mesma física de updateGame() no intervalo do
+firmware, as mesmas linhas de texto e os quadros binários de telemetria.
+
+Cada placa aparece como um caminho /dev/pts/N que o SerialManager e o
+OLRGUIConfig abrem como uma porta serial comum. Todas as placas rodam em um
+único laço de eventos (selectors), sem uma thread por placa, para permitir
+testes de carga com muitas pistas simuladas.
+
+Uso: python esp32_simulator.py [--boards 1] [--cars 4] [--link /tmp/autorama]
+"""
+
+import argparse
+import os
+import selectors
+import sys
+import time
+import tty
+from array import array
+from collections import deque
+
+from autorama_protocol import CarSample, TelemetryFrame, encode_frame
+
+# Constantes de src/Race.ino
+NUM_LEDS = 200
+TOTAL_LAPS = 5
+MAX_SPEED = 5.0
+ACCELERATION = 0.5
+FRICTION = 0.1
+PHYSICS_INTERVAL_MS = 50
+TELEMETRY_HZ = 50
+TELEMETRY_IDLE_HZ = 2
+TEST_STEP_MS = 1000  # delay() entre as cores do modo teste e do setup
+VICTORY_MS = 10 * 400  # 10 piscadas de 200 ms acesa + 200 ms apagada
+
+CAR_NAMES = ["Vermelho", "Verde", "Azul", "Amarelo"]
+ACCELERATE_COMMANDS = {'a': 0, 'A': 0, '2': 1, 'd': 2, 'D': 2, 'f': 3, 'F': 3}
+MAX_PENDING_OUTPUT = 65536  # Bytes guardados enquanto ninguém lê a porta
+
+
+def _float(value):
+    """Formata como Serial.print(float) do Arduino (duas casas)"""
+    return f"{value:.2f}"
+
+
+class VirtualBoard:
+    """Estado e saída serial de uma placa; o tempo é passado em milissegundos
+
+    A placa não faz I/O: feed() recebe os bytes enviados pelo computador e
+    poll() executa o loop() do firmware, ambos acumulando a saída em output.
+    Os delay() bloqueantes do firmware (setup, modo teste, vitória) viram
+    períodos ocupados em que comandos esperam e a física fica parada.
+    """
+
+    def __init__(self, num_cars=4, boot=True, now_ms=0, total_laps=TOTAL_LAPS):
+        self.num_cars = num_cars
+        self.total_laps = total_laps
+        self.output = bytearray()
+        self.race_started = False
+        self.winner = -1
+        # float32 como no firmware
+        self.speeds = array('f', [0.0]) * num_cars
+        self.positions = array('f', [0.0]) * num_cars
+        self.laps = array('H', [0]) * num_cars
+        self.telemetry_seq = 0
+        self._last_physics_ms = 0
+        self._last_telemetry_ms = 0
+        self._input = bytearray()
+        self._scheduled = deque()  # (instante ms, linha) de saídas com delay()
+        self._busy_until = now_ms
+        if boot:
+            self._boot(now_ms)
+
+    def _println(self, text=""):
+        self.output += f"{text}\r\n".encode('utf-8')
+
+    def _delayed(self, now_ms, steps):
+        """Agenda grupos de linhas separados por TEST_STEP_MS e ocupa a placa até o fim"""
+        for step, lines in enumerate(steps):
+            for line in lines:
+                self._scheduled.append((now_ms + step * TEST_STEP_MS, line))
+        self._busy_until = now_ms + (len(steps) - 1) * TEST_STEP_MS
+
+    def _boot(self, now_ms):
+        """Mensagens do setup(), com o teste de cores de 4 s"""
+        self._println("🚀 OLR ESP32 - JOGO COMPLETO")
+        self._println("💡 LEDs inicializados")
+        self._println("🎨 Cores dos carros:")
+        for line in ("  Carro 1 (Vermelho): 0xFF00", "  Carro 2 (Verde): 0xFF0000",
+                     "  Carro 3 (Azul): 0xFF", "  Carro 4 (Amarelo): 0xFFFF00",
+                     "🧪 Teste inicial de cores...", "🔴 Teste: VERMELHO"):
+            self._println(line)
+        self._delayed(now_ms, [
+            (), ("🟢 Teste: VERDE",), ("🔵 Teste: AZUL",), ("🟡 Teste: AMARELO",),
+            ("⚫ LEDs apagados", "✅ Setup concluído!", "🎯 Corrida termina em 5 voltas!",
+             "📋 Comandos disponíveis:", "  g = GO (iniciar corrida)",
+             "  a = Acelerar Carro 1 (Vermelho)", "  2 = Acelerar Carro 2 (Verde)",
+             "  d = Acelerar Carro 3 (Azul)", "  f = Acelerar Carro 4 (Amarelo)",
+             "  r = RESET", "  t = TESTE", "  s = STATUS",
+             "  c = CLEAR (limpar fita)", "  v = VIEW (ver todos os carros)"),
+        ])
+
+    def feed(self, data, now_ms):
+        """Bytes recebidos pela serial da placa"""
+        self._input += data
+        if now_ms >= self._busy_until:
+            self._drain_input(now_ms)
+
+    def _drain_input(self, now_ms):
+        """while (Serial.available()) do loop()"""
+        data, self._input = self._input, bytearray()
+        for index, byte in enumerate(data):
+            cmd = chr(byte)
+            # Ignorar quebras de linha e espaços enviados por terminais
+            if cmd in '\n\r ':
+                continue
+            self._process_command(cmd, now_ms)
+            if now_ms < self._busy_until:
+                # Modo teste bloqueia o loop(): o resto espera na serial
+                self._input = data[index + 1:]
+                return
+
+    def poll(self, now_ms):
+        """Executa o loop() até now_ms; retorna o instante da próxima tarefa"""
+        while self._scheduled and self._scheduled[0][0] <= now_ms:
+            self._println(self._scheduled.popleft()[1])
+        if now_ms < self._busy_until:
+            return self._scheduled[0][0] if self._scheduled else self._busy_until
+        if self._input:
+            self._drain_input(now_ms)
+
+        if self.race_started and now_ms - self._last_physics_ms >= PHYSICS_INTERVAL_MS:
+            self._last_physics_ms = now_ms
+            self._update_game(now_ms)
+
+        interval = 1000 // (TELEMETRY_HZ if self.race_started else TELEMETRY_IDLE_HZ)
+        if now_ms - self._last_telemetry_ms >= interval:
+            self._last_telemetry_ms = now_ms
+            self._send_telemetry_frame(now_ms)
+
+        if now_ms < self._busy_until:
+            return self._busy_until
+        next_ms = self._last_telemetry_ms + interval
+        if self.race_started:
+            next_ms = min(next_ms, self._last_physics_ms + PHYSICS_INTERVAL_MS)
+        return next_ms
+
+    def _send_telemetry_frame(self, now_ms):
+        cars = tuple(
+            CarSample(i + 1, self.positions[i], self.speeds[i], self.laps[i])
+            for i in range(self.num_cars)
+        )
+        self.output += encode_frame(TelemetryFrame(
+            self.telemetry_seq, now_ms, self.race_started, self.winner + 1, cars
+        ))
+        self.telemetry_seq = (self.telemetry_seq + 1) & 0xFFFF
+
+    def _reset_cars(self):
+        for i in range(self.num_cars):
+            self.positions[i] = 0.0
+            self.speeds[i] = 0.0
+            self.laps[i] = 0
+
+    def _process_command(self, cmd, now_ms):
+        self._println(f"📡 Comando: {cmd}")
+
+        if cmd in 'gG':
+            self._println("🏁 GO - Iniciando corrida!")
+            self.race_started = True
+            self.winner = -1
+            self._reset_cars()
+            self._println(f"🎯 Meta: {self.total_laps} voltas para vencer!")
+        elif cmd in ACCELERATE_COMMANDS:
+            car = ACCELERATE_COMMANDS[cmd]
+            self._println(f"🚗 Carro {car + 1} ({CAR_NAMES[car]}) acelerando!")
+            if self.race_started and car < self.num_cars:
+                self.speeds[car] = min(self.speeds[car] + ACCELERATION, MAX_SPEED)
+                self._println(f"  Nova velocidade: {_float(self.speeds[car])}")
+        elif cmd in 'rR':
+            self._println("🔄 RESET - Parando corrida!")
+            self.race_started = False
+            self.winner = -1
+            self._reset_cars()
+        elif cmd in 'tT':
+            self._println("🧪 TESTE - Modo teste!")
+            self._println("🧪 Iniciando modo teste...")
+            self._delayed(now_ms, [("🔴 Carro 1 - Vermelho",), ("🟢 Carro 2 - Verde",),
+                                   ("🔵 Carro 3 - Azul",), ("🟡 Carro 4 - Amarelo",),
+                                   ("✅ Teste concluído!",)])
+        elif cmd in 'sS':
+            self._println("📊 STATUS:")
+            self._println(f"  Corrida: {'ATIVA' if self.race_started else 'INATIVA'}")
+            if self.winner != -1:
+                self._println(f"🏆 VENCEDOR: Carro {self.winner + 1}")
+            for i in range(self.num_cars):
+                self._println(
+                    f"  Carro {i + 1}: Vel={_float(self.speeds[i])}, "
+                    f"Pos={_float(self.positions[i])}, Voltas={self.laps[i]}/{self.total_laps}"
+                )
+        elif cmd in 'cC':
+            self._println("🧹 Limpando fita LED...")
+        elif cmd in 'vV':
+            self._println("👀 Mostrando todos os carros na fita...")
+            for i in range(self.num_cars):
+                self._println(f"  Carro {i + 1} na posição {int(self.positions[i]) % NUM_LEDS}")
+            self._println("✅ Todos os carros exibidos!")
+        else:
+            self._println(f"❓ Comando desconhecido: {cmd}")
+
+    def _update_game(self, now_ms):
+        if self.winner != -1:
+            return
+        for i in range(self.num_cars):
+            if self.speeds[i] <= 0:
+                continue
+            # Fricção e deslocamento
+            self.speeds[i] = max(self.speeds[i] - FRICTION, 0.0)
+            self.positions[i] += self.speeds[i]
+
+            # Volta completa
+            if self.positions[i] >= NUM_LEDS:
+                self.positions[i] = 0.0
+                self.laps[i] += 1
+                self._println(
+                    f"🏁 Carro {i + 1} completou volta {self.laps[i]}/{self.total_laps}"
+                    f" - Velocidade: {_float(self.speeds[i])}"
+                )
+                if self.laps[i] >= self.total_laps:
+                    self.winner = i
+                    self.race_started = False
+                    self._println("🎉🎉🎉 CORRIDA TERMINOU! 🎉🎉🎉")
+                    self._println(f"🏆 VENCEDOR: Carro {i + 1}!")
+                    # showVictory(): a fita pisca por 4 s com a placa bloqueada
+                    self._busy_until = now_ms + VICTORY_MS
+                    return
+
+
+class _Port:
+    """Pseudo-terminal de uma placa"""
+
+    __slots__ = ('board', 'master', 'slave', 'path', 'writing')
+
+    def __init__(self, board, master, slave, path):
+        self.board = board
+        self.master = master
+        self.slave = slave
+        self.path = path
+        self.writing = False
+
+
+class Simulator:
+    """Laço de eventos único para todas as placas virtuais"""
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._ports = []
+        self._started = time.monotonic()
+        self.bytes_read = 0  # Comandos recebidos de todas as portas
+        self.bytes_written = 0  # Linhas e quadros enviados a todas as portas
+
+    def millis(self):
+        """Relógio das placas: ms desde o início do simulador"""
+        return int((time.monotonic() - self._started) * 1000)
+
+    def add_board(self, num_cars=4, boot=True, link=None, total_laps=TOTAL_LAPS):
+        """Cria uma placa e retorna o caminho da porta serial"""
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        os.set_blocking(master, False)
+        path = os.ttyname(slave)
+        if link:
+            if os.path.islink(link):
+                os.remove(link)
+            os.symlink(path, link)
+            path = link
+        port = _Port(VirtualBoard(num_cars, boot, self.millis(), total_laps), master, slave, path)
+        self._ports.append(port)
+        self._selector.register(master, selectors.EVENT_READ, port)
+        return path
+
+    def _flush(self, port):
+        """Escreve o que a placa produziu sem bloquear o laço"""
+        output = port.board.output
+        if output:
+            try:
+                written = os.write(port.master, output)
+                del output[:written]
+                self.bytes_written += written
+            except BlockingIOError:
+                pass
+            # Sem ninguém lendo a porta: descartar o mais antigo, como a UART
+            if len(output) > MAX_PENDING_OUTPUT:
+                del output[:len(output) - MAX_PENDING_OUTPUT]
+        writing = bool(output)
+        if writing != port.writing:
+            port.writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self._selector.modify(port.master, events, port)
+
+    def run(self, duration=None):
+        """Executa o laço até duration segundos (ou para sempre)"""
+        stop_at = None if duration is None else time.monotonic() + duration
+        while stop_at is None or time.monotonic() < stop_at:
+            now_ms = self.millis()
+            next_ms = now_ms + 1000
+            for port in self._ports:
+                next_ms = min(next_ms, port.board.poll(now_ms))
+                self._flush(port)
+
+            timeout = max(0.0, (next_ms - self.millis()) / 1000)
+            if stop_at is not None:
+                timeout = min(timeout, max(0.0, stop_at - time.monotonic()))
+            for key, mask in self._selector.select(timeout):
+                port = key.data
+                if mask & selectors.EVENT_READ:
+                    try:
+                        data = os.read(port.master, 4096)
+                    except (BlockingIOError, OSError):
+                        data = b''
+                    if data:
+                        self.bytes_read += len(data)
+                        port.board.feed(data, self.millis())
+                self._flush(port)
+
+    def close(self):
+        for port in self._ports:
+            self._selector.unregister(port.master)
+            os.close(port.master)
+            os.close(port.slave)
+        self._ports.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de ESP32 do autorama em pseudo-terminais")
+    parser.add_argument('--boards', type=int, default=1, help='número de placas simuladas')
+    parser.add_argument('--cars', type=int, default=4, help='carros por placa')
+    parser.add_argument('--link', help='criar links simbólicos <link>, <link>1, ... para as portas')
+    parser.add_argument('--no-boot', action='store_true', help='pular as mensagens de setup')
+    parser.add_argument('--laps', type=int, default=TOTAL_LAPS,
+                        help='voltas para vencer (o firmware usa 5)')
+    parser.add_argument('--duration', type=float, help='encerrar após N segundos')
+    args = parser.parse_args()
+
+    simulator = Simulator()
+    for index in range(args.boards):
+        link = None
+        if args.link:
+            link = args.link if index == 0 else f"{args.link}{index}"
+        path = simulator.add_board(args.cars, boot=not args.no_boot, link=link,
+                                   total_laps=args.laps)
+        print(f"🔌 Placa {index + 1}: {path}")
+    print("🛑 Pressione Ctrl+C para parar")
+
+    try:
+        simulator.run(args.duration)
+    except KeyboardInterrupt:
+        print("\n👋 Simulador encerrado")
+    finally:
+        print(f"📊 Bytes: recebidos={simulator.bytes_read} enviados={simulator.bytes_written}",
+              flush=True)
+        simulator.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Estado dos Carros - Autorama LED Race Game
+Tabela pré-alocada com um array por campo (posição, velocidade, voltas, bateria e
+instante da última atualização), indexada pelo número do carro (1-based,
+como no firmware e no protocolo).
+
+A bateria só é conhecida pela telemetria de texto antiga (p1T1,50,100);
+-1 indica valor desconhecido.
+
+O número de carros vem de AUTORAMA_NUM_CARS (padrão 4, máximo MAX_CARS).
+As atualizações apenas escrevem nos arrays; o dicionário JSON só é montado
+quando alguém pede uma visão (publicação do stream ou rota HTTP).
+"""
+
+import os
+from array import array
+from datetime import datetime
+
+from autorama_protocol import MAX_CARS
+
+DEFAULT_NUM_CARS = 4
+
+
+def configured_num_cars(default=DEFAULT_NUM_CARS):
+    """Número de carros configurado em AUTORAMA_NUM_CARS"""
+    value = os.environ.get('AUTORAMA_NUM_CARS')
+    num_cars = int(value) if value else default
+    if not 1 <= num_cars <= MAX_CARS:
+        raise ValueError(f"AUTORAMA_NUM_CARS deve estar entre 1 e {MAX_CARS}: {num_cars}")
+    return num_cars
+
+
+class CarStateTable:
+    """Estado de N carros em arrays paralelos pré-alocados"""
+
+    __slots__ = ('num_cars', 'position', 'speed', 'laps', 'battery', 'last_update', '_keys')
+
+    def __init__(self, num_cars=DEFAULT_NUM_CARS):
+        if not 1 <= num_cars <= MAX_CARS:
+            raise ValueError(f"Número de carros deve estar entre 1 e {MAX_CARS}: {num_cars}")
+        self.num_cars = num_cars
+        self.position = array('d', [0.0]) * num_cars
+        self.speed = array('d', [0.0]) * num_cars
+        self.laps = array('H', [0]) * num_cars
+        self.battery = array('h', [-1]) * num_cars
+        self.last_update = array('d', [0.0]) * num_cars  # time.time(); 0 = nunca
+        self._keys = tuple(range(1, num_cars + 1))
+
+    def __len__(self):
+        return self.num_cars
+
+    def __contains__(self, car):
+        return 1 <= car <= self.num_cars
+
+    def update(self, car, position=None, speed=None, laps=None, battery=None, now=None):
+        """Atualiza os campos informados de um carro; False se o carro não existe"""
+        index = car - 1
+        if not 0 <= index < self.num_cars:
+            return False
+        if position is not None:
+            self.position[index] = position
+        if speed is not None:
+            self.speed[index] = speed
+        if laps is not None:
+            self.laps[index] = laps
+        if battery is not None:
+            self.battery[index] = battery
+        self.last_update[index] = datetime.now().timestamp() if now is None else now
+        return True
+
+    def apply_samples(self, samples, now=None):
+        """Aplica as amostras (CarSample) de um quadro binário de telemetria"""
+        if now is None:
+            now = datetime.now().timestamp()
+        position, speed, laps, last_update = self.position, self.speed, self.laps, self.last_update
+        for sample in samples:
+            index = sample.car - 1
+            if 0 <= index < self.num_cars:
+                position[index] = sample.position
+                speed[index] = sample.speed
+                laps[index] = sample.laps
+                last_update[index] = now
+
+    def reset(self):
+        """Zera posição, velocidade e voltas de todos os carros"""
+        for index in range(self.num_cars):
+            self.position[index] = 0.0
+            self.speed[index] = 0.0
+            self.laps[index] = 0
+
+    def snapshot(self):
+        """Cópia dos arrays (posição, velocidade, voltas, bateria, última atualização)"""
+        return self.position[:], self.speed[:], self.laps[:], self.battery[:], self.last_update[:]
+
+    def to_json(self):
+        """Visão JSON no formato {carro: {position, speed, laps, battery, last_update}}"""
+        return {
+            car: {
+                'position': position,
+                'speed': speed,
+                'laps': laps,
+                'battery': battery if battery >= 0 else None,
+                'last_update': datetime.fromtimestamp(updated).isoformat() if updated else None,
+            }
+            for car, position, speed, laps, battery, updated in zip(
+                self._keys, self.position, self.speed, self.laps, self.battery, self.last_update)
+        }
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Cronometragem de Voltas - Autorama LED Race Game
+Motor incremental de tempos alimentado pelos eventos de volta do firmware:
+volta atual, última volta, melhor volta, diferença para o líder e ordem de
+classificação, com instantes de time.monotonic().
+
+Cada volta completada custa O(carros): os arrays do carro são atualizados e
+ele é reposicionado na ordem sem reordenar a lista inteira. A diferença para
+o líder usa o instante em que o primeiro carro completou cada volta, então
+nenhum histórico é percorrido. Carros são 1-based, como no protocolo.
+"""
+
+import threading
+import time
+from array import array
+
+
+def format_lap_time(seconds):
+    """Formata um tempo de volta como mm:ss.s ("--:--" se desconhecido)"""
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes):02d}:{seconds:04.1f}"
+
+
+class LapTimer:
+    """Tempos e classificação de N carros"""
+
+    def __init__(self, num_cars):
+        self.num_cars = num_cars
+        self.laps = array('H', [0]) * num_cars
+        self.lap_start = array('d', [0.0]) * num_cars  # Início da volta atual
+        self.last_lap = array('d', [0.0]) * num_cars  # 0 = ainda sem volta
+        self.best_lap = array('d', [0.0]) * num_cars
+        self.crossed_at = array('d', [0.0]) * num_cars  # Instante da última volta
+        self.order = list(range(1, num_cars + 1))  # Carros do primeiro ao último
+        self._first_crossing = []  # [volta - 1] -> instante em que o líder a completou
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.finished_at = None  # Relógios parados no fim da corrida
+
+    def start(self, now=None):
+        """Zera os tempos e inicia a corrida"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for index in range(self.num_cars):
+                self.laps[index] = 0
+                self.lap_start[index] = now
+                self.last_lap[index] = 0.0
+                self.best_lap[index] = 0.0
+                self.crossed_at[index] = now
+            self.order = list(range(1, self.num_cars + 1))
+            self._first_crossing = []
+            self.started_at = now
+            self.finished_at = None
+
+    def reset(self):
+        """Para a corrida e zera os tempos"""
+        self.start()
+        with self._lock:
+            self.started_at = None
+
+    def finish(self, now=None):
+        """Para os relógios no fim da corrida; tempos e classificação ficam congelados"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.started_at is not None and self.finished_at is None:
+                self.finished_at = now
+
+    def race_time(self, now=None):
+        """Tempo de corrida até agora (ou até o fim); None antes da largada"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.started_at is None:
+                return None
+            return (self.finished_at or now) - self.started_at
+
+    def lap_completed(self, car, lap, now=None):
+        """Registra que o carro chegou a lap voltas; repetições são ignoradas
+
+        Retorna True se a volta era nova; uma linha repetida ou reprocessada
+        não conta a mesma volta duas vezes.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._lap_completed(car, lap, now)
+
+    def _lap_completed(self, car, lap, now):
+        index = car - 1
+        if self.started_at is None or not 0 <= index < self.num_cars or lap <= self.laps[index]:
+            return False
+
+        lap_time = now - self.lap_start[index]
+        if lap == self.laps[index] + 1:
+            self.last_lap[index] = lap_time
+            if not self.best_lap[index] or lap_time < self.best_lap[index]:
+                self.best_lap[index] = lap_time
+        # Voltas puladas (eventos perdidos) não têm tempo confiável
+        self.laps[index] = lap
+        self.lap_start[index] = now
+        self.crossed_at[index] = now
+        while len(self._first_crossing) < lap:
+            self._first_crossing.append(now)
+
+        # Reposicionar o carro: mais voltas primeiro, empate pela passagem mais antiga
+        self.order.remove(car)
+        position = 0
+        for other in self.order:
+            other_index = other - 1
+            if self.laps[other_index] < lap or (
+                    self.laps[other_index] == lap and self.crossed_at[other_index] > now):
+                break
+            position += 1
+        self.order.insert(position, car)
+        return True
+
+    def standings(self, now=None):
+        """Classificação atual: uma entrada por carro, do líder ao último"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._standings(self.finished_at or now)
+
+    def _standings(self, now):
+        leader_laps = self.laps[self.order[0] - 1]
+        result = []
+        for position, car in enumerate(self.order, 1):
+            index = car - 1
+            laps = self.laps[index]
+            # Diferença para o líder na mesma volta (voltas de atraso à parte)
+            gap = None
+            if laps:
+                gap = round(self.crossed_at[index] - self._first_crossing[laps - 1], 3)
+            result.append({
+                'position': position,
+                'car': car,
+                'laps': laps,
+                'current_lap': round(now - self.lap_start[index], 3) if self.started_at is not None else None,
+                'last_lap': round(self.last_lap[index], 3) or None,
+                'best_lap': round(self.best_lap[index], 3) or None,
+                'gap': gap,
+                'laps_behind': leader_laps - laps,
+            })
+        return result
+
+    def fastest_lap(self):
+        """(carro, tempo) da melhor volta da corrida ou None"""
+        best = None
+        with self._lock:
+            best_laps = self.best_lap[:]
+        for index, lap_time in enumerate(best_laps):
+            if lap_time and (best is None or lap_time < best[1]):
+                best = (index + 1, lap_time)
+        return best
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Logging Assíncrono - Autorama LED Race Game
+Tira a escrita dos logs do caminho das requisições: quem loga só coloca o
+registro em uma fila limitada, e uma thread de fundo (QueueListener) grava no
+arquivo e no terminal. O arquivo é rotacionado por tamanho.
+
+Mensagens de alta frequência (comandos de aceleração, telemetria, linhas de
+acesso do werkzeug) passam por um limite de taxa por tipo de mensagem: no
+máximo LOG_BURST registros a cada LOG_WINDOW segundos por modelo de mensagem
+(ou por rota, nas linhas de acesso). As descartadas são contadas e informadas
+na próxima mensagem do mesmo tipo. Avisos e erros nunca são limitados.
+
+Para o limite reconhecer o tipo da mensagem, use o estilo preguiçoso do
+logging (logger.info("Resposta recebida: %s", resposta)) nos caminhos quentes.
+"""
+
+import atexit
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_MAX_BYTES = 1024 * 1024  # Tamanho do arquivo antes de rotacionar
+LOG_BACKUPS = 3  # Arquivos antigos mantidos (autorama_server.log.1 ... .3)
+LOG_QUEUE_SIZE = 10000  # Registros aguardando a thread de escrita
+LOG_WINDOW = 1.0  # Janela do limite de taxa (s)
+LOG_BURST = 5  # Registros por tipo de mensagem em cada janela
+LOG_MAX_KEYS = 1024  # Tipos de mensagem acompanhados antes de varrer as janelas vencidas
+
+_listener = None  # LogWriter ativo
+
+
+class RateLimitFilter(logging.Filter):
+    """Limita registros INFO/DEBUG repetidos por tipo de mensagem"""
+
+    def __init__(self, window=LOG_WINDOW, burst=LOG_BURST, max_keys=LOG_MAX_KEYS):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_keys = max_keys
+        self.suppressed = 0  # Total descartado desde o início
+        self._buckets = {}  # chave -> [início da janela, registros na janela, descartados]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(record):
+        """Tipo da mensagem: o método nas linhas de acesso, o modelo nas demais
+
+        A URL fica fora da chave: caminhos e ids de pista são escolhidos pelo
+        cliente e criariam um balde novo por requisição.
+        """
+        if record.name == 'werkzeug' and isinstance(record.args, tuple) and record.args:
+            # Linha de acesso: '"%s" %s %s' % ("POST /api/command HTTP/1.1", status, tamanho)
+            parts = str(record.args[0]).split(' ')
+            if len(parts) > 1:
+                return ('werkzeug', parts[0])
+        return (record.name, record.msg)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        key = self.key(record)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                bucket = self._buckets[key] = [now, 0, 0]
+            elif now - bucket[0] >= self.window:
+                bucket[0] = now
+                bucket[1] = 0
+            if bucket[1] >= self.burst:
+                bucket[2] += 1
+                self.suppressed += 1
+                return False
+            bucket[1] += 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.msg = f"{record.msg} (+{suppressed} semelhantes suprimidas)"
+        return True
+
+    def _prune(self, now):
+        """Remove baldes com a janela vencida; se nenhum venceu, recomeça do zero
+
+        Mensagens montadas com f-string têm um modelo diferente a cada
+        registro; sem a varredura o dicionário cresceria sem limite.
+        """
+        expired = [key for key, bucket in self._buckets.items() if now - bucket[0] >= self.window]
+        for key in expired:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler que descarta (e conta) registros quando a fila está cheia
+
+    Logar nunca bloqueia a thread da requisição, mesmo se o disco ou o
+    terminal travarem a thread de escrita.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter(QueueListener):
+    """Thread de escrita; ao parar espera vaga na fila para o sentinela"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def setup_logging(path, level=logging.INFO, stream=None, max_bytes=LOG_MAX_BYTES,
+                  backups=LOG_BACKUPS, rate_limit=True):
+    """Configura o logger raiz com fila, rotação e limite de taxa
+
+    Retorna o LogWriter já iniciado; ele é parado (esvaziando a fila) na
+    saída do processo ou por stop_logging().
+    """
+    global _listener
+    stop_logging()
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if path:
+        file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                           encoding='utf-8')
+        handlers.append(file_handler)
+    handlers.append(logging.StreamHandler(stream or sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = BoundedQueueHandler(log_queue)
+    if rate_limit:
+        queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = LogWriter(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def stop_logging():
+    """Grava os registros pendentes e para a thread de escrita"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def pipeline_stats():
+    """Registros descartados pela fila cheia e pelo limite de taxa"""
+    stats = {'dropped': 0, 'suppressed': 0}
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, BoundedQueueHandler):
+            stats['dropped'] += handler.dropped
+            for log_filter in handler.filters:
+                if isinstance(log_filter, RateLimitFilter):
+                    stats['suppressed'] += log_filter.suppressed
+    return stats
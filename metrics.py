@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Métricas - Autorama LED Race Game
+Contadores e histogramas de buckets fixos exportados no formato texto do
+Prometheus (GET /metrics).
+
+Registrar uma observação não usa lock: cada thread escreve nas suas próprias
+células (um array por combinação de labels), e só a leitura em /metrics soma
+as células de todas as threads. As células de threads encerradas (o servidor
+Flask usa uma thread por requisição) são incorporadas a um total acumulado
+para que a memória não cresça.
+"""
+
+import math
+import threading
+from array import array
+from bisect import bisect_left
+
+# Buckets padrão (s): de 1 ms a 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+_SWEEP_EVERY = 64  # Novas threads entre varreduras das células de threads encerradas
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _ThreadCells:
+    """Células por thread de uma métrica: {labels: array} em cada thread"""
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._threads = []  # (thread, {labels: array})
+        self._retired = {}  # Totais de threads encerradas
+        self._lock = threading.Lock()  # Só para registrar threads e para a leitura
+        self._registered = 0
+
+    def cell(self, labels):
+        """Array da thread atual para os labels (criado no primeiro uso)"""
+        try:
+            cells = self._local.cells
+        except AttributeError:
+            cells = self._local.cells = {}
+            with self._lock:
+                self._threads.append((threading.current_thread(), cells))
+                self._registered += 1
+                if self._registered % _SWEEP_EVERY == 0:
+                    self._sweep()
+        cell = cells.get(labels)
+        if cell is None:
+            cell = cells[labels] = array('d', [0.0]) * self._size
+        return cell
+
+    def _sweep(self):
+        """Incorpora ao total acumulado as células de threads que terminaram"""
+        alive = []
+        for thread, cells in self._threads:
+            if thread.is_alive():
+                alive.append((thread, cells))
+            else:
+                self._merge(self._retired, cells)
+        self._threads = alive
+
+    def _merge(self, target, cells):
+        for labels, cell in list(cells.items()):
+            total = target.get(labels)
+            if total is None:
+                total = target[labels] = array('d', [0.0]) * self._size
+            for index, value in enumerate(cell):
+                total[index] += value
+
+    def totals(self, unlabeled=False):
+        """{labels: array} somando todas as threads
+
+        Com unlabeled=True, uma métrica sem observações ainda exporta zero.
+        """
+        with self._lock:
+            self._sweep()
+            result = {labels: array('d', cell) for labels, cell in self._retired.items()}
+            for _, cells in self._threads:
+                self._merge(result, cells)
+        if unlabeled and not result:
+            result[()] = array('d', [0.0]) * self._size
+        return result
+
+
+class Counter:
+    """Contador monotônico com labels opcionais"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._cells = _ThreadCells(1)
+
+    def inc(self, amount=1, *labels):
+        self._cells.cell(labels)[0] += amount
+
+    def value(self, *labels):
+        cell = self._cells.totals().get(labels)
+        return cell[0] if cell else 0.0
+
+    def samples(self):
+        for labels, cell in sorted(self._cells.totals(not self.labelnames).items()):
+            yield self.name, _format_labels(self.labelnames, labels), cell[0]
+
+
+class Histogram:
+    """Histograma de buckets fixos (limites superiores inclusivos)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Contagem por bucket, o bucket +Inf e a soma no último elemento
+        self._cells = _ThreadCells(len(self.buckets) + 2)
+
+    def observe(self, value, *labels):
+        cell = self._cells.cell(labels)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def samples(self):
+        bounds = self.buckets + (math.inf,)
+        for labels, cell in sorted(self._cells.totals(not self.labelnames).items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, cell):
+                cumulative += count
+                yield (f'{self.name}_bucket',
+                       _format_labels(self.labelnames, labels, (('le', _format_value(bound)),)),
+                       cumulative)
+            label_text = _format_labels(self.labelnames, labels)
+            yield f'{self.name}_sum', label_text, cell[-1]
+            yield f'{self.name}_count', label_text, cumulative
+
+
+class Callback:
+    """Métrica lida na hora da exportação (profundidade de filas, totais externos)
+
+    function retorna um número ou um dict {tupla de labels: número}.
+    """
+
+    def __init__(self, name, documentation, function, kind='gauge', labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        values = self.function()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Registry:
+    """Conjunto de métricas exportadas juntas"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, function, kind='gauge', labelnames=()):
+        return self.register(Callback(name, documentation, function, kind, labelnames))
+
+    def render(self):
+        """Todas as métricas no formato texto do Prometheus (versão 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()  # Registro padrão do servidor
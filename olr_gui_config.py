@@ -4,22 +4,61 @@ OLR GUI Config - Interface gráfica com sliders para configuração em tempo rea
 Sliders para aceleração, velocidade máxima, inicial e controles do jogo
 """
 
+import logging
 import tkinter as tk
 from tkinter import ttk, messagebox
 import serial
+import queue
 import threading
 import time
 import sys
 from colorama import init, Fore, Back, Style
 
+from autorama_protocol import (
+    CarAccelerated, CarPosition, CarStatus, CommandEcho, LapCompleted, LegacyTelemetry,
+    LineParser, RaceFinished, RaceReset, RaceStarted, SpeedChanged, StreamDecoder,
+    TelemetryFrame
+)
+from game_state import configured_num_cars
+from lap_timing import LapTimer, format_lap_time
+from serial_broker import BROKER_PREFIX, BrokerSerial
+from sequence_runner import SequenceRunner, all_cars_sequence, car_1_sequence, format_result, summarize
+
 init(autoreset=True)
 
+# Cores dos carros (repetidas em pistas com mais carros que cores)
+CAR_COLORS = ["#ff00ff", "#00ff00", "#0000ff", "#ffff00",
+              "#ff8800", "#00ffff", "#ff0088", "#88ff00"]  # Carro 1 = magenta
+
+# Atualização da interface: a thread de monitoramento só enfileira eventos e o
+# loop do Tk aplica a fila em quadros de tamanho fixo
+UI_FPS = 30
+UI_FRAME_MS = 1000 // UI_FPS
+UI_MAX_EVENTS = 5000  # Eventos aplicados por quadro (o resto fica para o próximo)
+
+# Console de log: mensagens acumuladas e inseridas uma vez por quadro
+LOG_MAX_LINES = 2000  # Linhas mantidas no widget
+LOG_TRIM_LINES = 500  # Linhas antigas removidas de uma vez ao passar do limite
+# Linhas de alta frequência registradas como DEBUG (fora do log no nível padrão)
+CHATTER_EVENTS = (CommandEcho, CarAccelerated, SpeedChanged, CarStatus, CarPosition)
+
+def car_color(car_num):
+    """Cor do carro (índice 0-based)"""
+    return CAR_COLORS[car_num % len(CAR_COLORS)]
+
 class OLRGUIConfig:
-    def __init__(self, port="/dev/cu.usbserial-110", baudrate=115200):
+    def __init__(self, port="/dev/cu.usbserial-110", baudrate=115200, num_cars=4,
+                 log_lines=LOG_MAX_LINES, log_level=logging.INFO):
         self.port = port
         self.baudrate = baudrate
+        self.num_cars = num_cars
+        self.log_lines = log_lines
+        self.log_level = log_level
+        self.log_buffer = []  # Mensagens aguardando o próximo quadro
+        self.lap_timer = LapTimer(num_cars)
         self.ser = None
         self.running = True
+        self.events = queue.SimpleQueue()  # (evento, linha, instante) da thread de monitoramento
         
         # Valores atuais
         self.acceleration_rate = 0.3
@@ -30,14 +69,26 @@ class OLRGUIConfig:
         self.root = tk.Tk()
         self.setup_gui()
         
+        # Sequências de teste guiadas pelos eventos da ESP (sem bloquear o Tk)
+        self.tests = SequenceRunner(
+            send=self.send_sequence_command,
+            schedule=lambda seconds, callback: self.root.after(int(seconds * 1000), callback),
+            on_step=self.report_test_step,
+            on_done=self.report_test_done,
+        )
+        
     def connect(self):
         """Conectar à ESP via serial"""
         try:
-            self.ser = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=1
-            )
+            if self.port.startswith(BROKER_PREFIX):
+                # Porta compartilhada com o servidor web via serial_broker.py
+                self.ser = BrokerSerial.from_url(self.port, timeout=0.1)
+            else:
+                self.ser = serial.Serial(
+                    port=self.port,
+                    baudrate=self.baudrate,
+                    timeout=0.1
+                )
             self.status_label.config(text="✅ Conectado", fg="green")
             return True
         except Exception as e:
@@ -45,7 +96,11 @@ class OLRGUIConfig:
             return False
     
     def send_command(self, command):
-        """Enviar comando via serial"""
+        """Enviar comando via serial
+        
+        Só escreve: as respostas da ESP chegam pela thread de monitoramento,
+        única leitora da porta.
+        """
         if not self.ser:
             messagebox.showerror("Erro", "ESP não conectada!")
             return False
@@ -56,23 +111,18 @@ class OLRGUIConfig:
             
             # Enviar comando
             self.ser.write(f"{command}\n".encode())
-            
-            # Pequena pausa para processar
-            time.sleep(0.1)
-            
-            # Ler resposta se disponível
-            if self.ser.in_waiting:
-                response = self.ser.readline().decode().strip()
-                if response:
-                    self.log_message(f"📡 ESP: {response}")
-            
             return True
         except Exception as e:
             error_msg = f"Erro ao enviar comando: {e}"
-            self.log_message(f"❌ {error_msg}")
+            self.log_message(f"❌ {error_msg}", logging.ERROR)
             print(error_msg)
             return False
     
+    def send_sequence_command(self, command):
+        """Envio usado pelas sequências de teste (falha vira exceção)"""
+        if not self.send_command(command):
+            raise ConnectionError("comando não enviado")
+    
     def setup_gui(self):
         """Configurar interface gráfica"""
         self.root.title("🏁 OLR ESP32 - Configurador Visual")
@@ -273,20 +323,17 @@ class OLRGUIConfig:
         score_grid.pack(pady=10)
         
         # Cabeçalhos
-        headers = ["Carro", "Volta Atual", "Tempo Volta", "Melhor Tempo"]
+        headers = ["Carro", "Volta Atual", "Última Volta", "Melhor Tempo"]
         for i, header in enumerate(headers):
             tk.Label(score_grid, text=header, font=("Arial", 10, "bold"), 
                     fg="#00ff00", bg="#2b2b2b", width=12).grid(row=0, column=i, padx=5, pady=5)
         
         # Scores dos carros (serão atualizados dinamicamente)
         self.car_scores = {}
-        car_colors = ["#ff00ff", "#00ff00", "#0000ff", "#ffff00"]  # Carro 1 = magenta
-        car_names = ["Carro 1", "Carro 2", "Carro 3", "Carro 4"]
-        
-        for i in range(4):
+        for i in range(self.num_cars):
             # Nome do carro
-            tk.Label(score_grid, text=car_names[i], font=("Arial", 10), 
-                    fg=car_colors[i], bg="#2b2b2b", width=12).grid(row=i+1, column=0, padx=5, pady=2)
+            tk.Label(score_grid, text=f"Carro {i+1}", font=("Arial", 10), 
+                    fg=car_color(i), bg="#2b2b2b", width=12).grid(row=i+1, column=0, padx=5, pady=2)
             
             # Volta atual
             lap_label = tk.Label(score_grid, text="0", font=("Arial", 10), 
@@ -307,9 +354,7 @@ class OLRGUIConfig:
             self.car_scores[i] = {
                 'lap': lap_label,
                 'time': time_label,
-                'best': best_label,
-                'start_time': 0,
-                'last_lap_time': 0
+                'best': best_label
             }
         
         # Botão para atualizar scores
@@ -330,8 +375,9 @@ class OLRGUIConfig:
                                      highlightthickness=0)
         self.track_canvas.pack(pady=10)
         
-        # Desenhar pista base
+        # Desenhar pista base e criar os carros (reaproveitados a cada quadro)
         self.draw_track()
+        self.create_car_items()
         
         # Botão para atualizar visualização
         update_track_btn = tk.Button(track_frame, text="🔄 ATUALIZAR PISTA", 
@@ -372,7 +418,13 @@ class OLRGUIConfig:
         log_frame = ttk.Frame(status_frame)
         log_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
         
-        tk.Label(log_frame, text="📝 LOG DE COMANDOS:", fg="white", bg="#2b2b2b").pack(anchor=tk.W)
+        log_header = ttk.Frame(log_frame)
+        log_header.pack(fill=tk.X)
+        tk.Label(log_header, text="📝 LOG DE COMANDOS:", fg="white", bg="#2b2b2b").pack(side=tk.LEFT)
+        self.show_telemetry = tk.BooleanVar(value=self.log_level <= logging.DEBUG)
+        tk.Checkbutton(log_header, text="📡 Mostrar telemetria", variable=self.show_telemetry,
+                       command=self.update_log_level, fg="white", bg="#2b2b2b",
+                       selectcolor="#1a1a1a").pack(side=tk.RIGHT)
         
         self.log_text = tk.Text(log_frame, height=8, bg="#1a1a1a", fg="#00ff00", 
                                 font=("Consolas", 10))
@@ -389,9 +441,10 @@ class OLRGUIConfig:
         self.max_slider.config(command=self.update_max_value)
         self.init_slider.config(command=self.update_init_value)
         
-        # Iniciar thread de monitoramento
+        # Iniciar thread de monitoramento e o quadro periódico da interface
         self.monitor_thread = threading.Thread(target=self.monitor_serial, daemon=True)
         self.monitor_thread.start()
+        self.root.after(UI_FRAME_MS, self.ui_frame)
         
         # Configurar evento de fechamento da janela
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -430,74 +483,32 @@ class OLRGUIConfig:
     
     def test_all_cars(self):
         """Testar todos os carros para verificar funcionamento"""
-        if not self.ser:
-            messagebox.showerror("Erro", "ESP não conectada!")
-            return
-        
-        self.log_message("🧪 Testando todos os carros...")
-        
-        # Primeiro iniciar corrida
-        self.send_command("g")
-        time.sleep(0.5)
-        
-        # Testar aceleração de todos os carros
-        cars = ["a", "2", "d", "f"]  # Comandos corretos para cada carro
-        car_names = ["Carro 1", "Carro 2", "Carro 3", "Carro 4"]
-        
-        for i, (cmd, name) in enumerate(zip(cars, car_names)):
-            self.log_message(f"🚗 Testando {name} com comando '{cmd}'...")
-            self.send_command(cmd)
-            time.sleep(0.5)  # Mais tempo para ver resposta
-            
-            # Verificar se há resposta da ESP
-            if self.ser.in_waiting:
-                response = self.ser.readline().decode().strip()
-                if response:
-                    self.log_message(f"📡 {name} respondeu: {response}")
-                else:
-                    self.log_message(f"⚠️ {name} não respondeu")
-            else:
-                self.log_message(f"⚠️ {name} sem resposta")
-        
-        self.log_message("✅ Teste de todos os carros concluído!")
+        self.start_test("Teste de todos os carros", all_cars_sequence())
     
     def test_car_1_specifically(self):
         """Testar especificamente o carro 1 para debug"""
+        self.start_test("Teste específico do Carro 1", car_1_sequence())
+    
+    def start_test(self, name, steps):
+        """Iniciar uma sequência de teste em segundo plano"""
         if not self.ser:
             messagebox.showerror("Erro", "ESP não conectada!")
             return
-        
-        self.log_message("🔍 Testando especificamente o Carro 1...")
-        
-        # Verificar status atual
-        self.log_message("📊 Verificando status atual...")
-        self.send_command("s")
-        time.sleep(1)
-        
-        # Iniciar corrida
-        self.log_message("🏁 Iniciando corrida...")
-        self.send_command("g")
-        time.sleep(1)
-        
-        # Verificar status após iniciar
-        self.log_message("📊 Verificando status após GO...")
-        self.send_command("s")
-        time.sleep(1)
-        
-        # Testar carro 1 várias vezes
-        for i in range(3):
-            self.log_message(f"🚗 Tentativa {i+1} - Carro 1 acelerando...")
-            self.send_command("a")
-            time.sleep(0.5)
-            
-            # Verificar resposta
-            if self.ser.in_waiting:
-                response = self.ser.readline().decode().strip()
-                self.log_message(f"📡 Resposta: {response}")
-            else:
-                self.log_message("⚠️ Sem resposta")
-        
-        self.log_message("🔍 Teste específico do Carro 1 concluído!")
+        if self.tests.running:
+            self.log_message(f"⏳ Aguarde: {self.tests.name} em andamento", logging.WARNING)
+            return
+        self.log_message(f"🧪 {name}...")
+        self.tests.start(name, steps)
+    
+    def report_test_step(self, result):
+        """Registrar no log o resultado de um passo"""
+        self.log_message(format_result(result), logging.INFO if result.ok else logging.WARNING)
+    
+    def report_test_done(self, name, results):
+        """Registrar no log o relatório final da sequência"""
+        ok = all(result.ok for result in results)
+        self.log_message(f"{'✅' if ok else '⚠️'} {summarize(name, results)}",
+                         logging.INFO if ok else logging.WARNING)
     
     def update_scores(self):
         """Atualizar scores dos carros via comando de status"""
@@ -507,38 +518,58 @@ class OLRGUIConfig:
         
         self.log_message("📊 Atualizando scores...")
         self.send_command("s")
-        
-        # Simular atualização de scores (será implementado quando ESP retornar dados)
-        for i in range(4):
-            # Simular dados para teste
-            lap = i + 1
-            time_str = f"{lap:02d}:{lap*10:02d}"
-            best_str = f"{lap-1:02d}:{(lap-1)*8:02d}" if lap > 1 else "--:--"
-            
-            self.car_scores[i]['lap'].config(text=str(lap))
-            self.car_scores[i]['time'].config(text=time_str)
-            self.car_scores[i]['best'].config(text=best_str)
-        
+        self.refresh_scores()
         self.log_message("📊 Scores atualizados!")
     
+    def refresh_scores(self):
+        """Preencher o painel de scores com a cronometragem das voltas"""
+        for entry in self.lap_timer.standings():
+            widgets = self.car_scores[entry['car'] - 1]
+            widgets['lap'].config(text=str(entry['laps']))
+            widgets['time'].config(text=format_lap_time(entry['last_lap']))
+            widgets['best'].config(text=format_lap_time(entry['best_lap']))
+    
     def draw_track(self):
-        """Desenhar a pista base"""
-        # Limpar canvas
-        self.track_canvas.delete("all")
+        """Desenhar a pista base (camada estática, abaixo dos carros)"""
+        self.track_canvas.delete("track")
         
         # Desenhar pista retangular
-        self.track_canvas.create_rectangle(10, 20, 390, 80, outline="#00ff00", width=2, fill="#0a0a0a")
+        self.track_canvas.create_rectangle(10, 20, 390, 80, outline="#00ff00", width=2, fill="#0a0a0a",
+                                           tags="track")
         
         # Marcar posições importantes
-        self.track_canvas.create_text(200, 10, text="🏁 LINHA DE CHEGADA", fill="#00ff00", font=("Arial", 8, "bold"))
+        self.track_canvas.create_text(200, 10, text="🏁 LINHA DE CHEGADA", fill="#00ff00", font=("Arial", 8, "bold"),
+                                      tags="track")
         
         # Marcar posições dos carros (inicialmente na linha de partida)
-        car_colors = ["#ffffff", "#00ff00", "#0000ff", "#ffff00"]  # Carro 1 agora é branco
-        for i in range(4):
+        for i in range(self.num_cars):
             x = 30 + (i * 20)
             y = 50
-            self.track_canvas.create_oval(x-5, y-5, x+5, y+5, fill=car_colors[i], outline="white")
-            self.track_canvas.create_text(x, y+15, text=f"C{i+1}", fill=car_colors[i], font=("Arial", 8, "bold"))
+            color = "#ffffff" if i == 0 else car_color(i)  # Carro 1 é branco na largada
+            self.track_canvas.create_oval(x-5, y-5, x+5, y+5, fill=color, outline="white", tags="track")
+            self.track_canvas.create_text(x, y+15, text=f"C{i+1}", fill=color, font=("Arial", 8, "bold"),
+                                          tags="track")
+        self.track_canvas.tag_lower("track")
+    
+    def create_car_items(self):
+        """Criar uma vez os itens de cada carro (ocultos até a primeira posição)
+        
+        update_car_position só move e reconfigura esses itens com coords() e
+        itemconfig(), sem apagar e recriar nada no canvas.
+        """
+        self.car_items = []
+        self.car_drawn = [None] * self.num_cars  # (x, y, volta) desenhados por último
+        for car_num in range(self.num_cars):
+            color = car_color(car_num)
+            tags = ("car", f"car_{car_num}")
+            oval = self.track_canvas.create_oval(0, 0, 0, 0, fill=color, outline="white",
+                                                 state="hidden", tags=tags)
+            number = self.track_canvas.create_text(0, 0, text=f"{car_num+1}",
+                                                   fill="black" if color == "#ffff00" else "white",
+                                                   font=("Arial", 8, "bold"), state="hidden", tags=tags)
+            lap_text = self.track_canvas.create_text(0, 0, text="", fill=color,
+                                                     font=("Arial", 6, "bold"), state="hidden", tags=tags)
+            self.car_items.append((oval, number, lap_text))
     
     def update_track_visualization(self):
         """Atualizar visualização da pista com posições atuais"""
@@ -550,37 +581,80 @@ class OLRGUIConfig:
         self.send_command("p")  # Solicitar telemetria
         
         # A visualização será atualizada automaticamente quando a telemetria chegar
-        self.draw_track()
     
-    def process_telemetry(self, data):
-        """Processar dados de telemetria da ESP"""
-        try:
-            # Formato: p1T1,50,100 (carro 1, volta 1, posição 50, bateria 100)
-            if data.startswith('p') and 'T' in data:
-                parts = data[1:].split('T')  # Remove 'p' e divide por 'T'
-                if len(parts) == 2:
-                    car_num = int(parts[0]) - 1  # Carro 0-3
-                    values = parts[1].split(',')
-                    if len(values) >= 3 and 0 <= car_num < 4:
-                        lap = int(values[0])
-                        pos = int(values[1])
-                        battery = int(values[2])
-                        
-                        # Atualizar interface
-                        self.car_scores[car_num]['lap'].config(text=str(lap))
-                        self.car_scores[car_num]['time'].config(text=f"{pos:02d}:{battery:02d}")
-                        
-                        # Atualizar melhor tempo se necessário
-                        current_best = self.car_scores[car_num]['best'].cget('text')
-                        if current_best == "--:--" or battery < int(current_best.split(':')[1]):
-                            self.car_scores[car_num]['best'].config(text=f"{lap:02d}:{battery:02d}")
-                        
-                        # Atualizar visualização da pista
-                        self.update_car_position(car_num, pos, lap)
-                        
-                        self.log_message(f"📡 Carro {car_num+1}: Volta {lap}, Pos {pos}, Bat {battery}")
-        except Exception as e:
-            self.log_message(f"❌ Erro ao processar telemetria: {e}")
+    def ui_frame(self):
+        """Aplicar os eventos enfileirados desde o último quadro (thread do Tk)
+        
+        Posição e volta de cada carro são desenhadas uma vez por quadro com o
+        valor mais recente, por mais linhas e quadros que tenham chegado.
+        """
+        latest = {}  # carro (0-based) -> (posição, volta)
+        scores_dirty = False
+        for _ in range(UI_MAX_EVENTS):
+            try:
+                event, line, now = self.events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                scores_dirty |= self.apply_event(event, line, now, latest)
+            except Exception as e:
+                self.log_message(f"❌ Erro ao processar telemetria: {e}", logging.ERROR)
+        
+        for car_num, (pos, lap) in latest.items():
+            self.car_scores[car_num]['lap'].config(text=str(lap))
+            self.update_car_position(car_num, pos, lap)
+        if scores_dirty:
+            self.refresh_scores()
+        self.flush_log()
+        
+        if self.running:
+            self.root.after(UI_FRAME_MS, self.ui_frame)
+    
+    def apply_event(self, event, line, now, latest):
+        """Aplicar um evento ao estado do quadro; retorna True se os scores mudaram"""
+        if event is None:  # Mensagem da própria thread de monitoramento
+            self.log_message(line, logging.ERROR)
+            return False
+        self.tests.feed(event, now)
+        if isinstance(event, TelemetryFrame):
+            self.process_frame(event, latest)
+            return False
+        if isinstance(event, LegacyTelemetry):
+            self.process_telemetry(event, latest)
+            return False
+        
+        scores_dirty = False
+        if isinstance(event, LapCompleted):
+            scores_dirty = self.lap_timer.lap_completed(event.car, event.lap, now)
+        elif isinstance(event, RaceStarted):
+            self.lap_timer.start(now)
+            scores_dirty = True
+        elif isinstance(event, RaceFinished):
+            self.lap_timer.finish(now)
+            scores_dirty = True
+        elif isinstance(event, RaceReset):
+            self.lap_timer.reset()
+            scores_dirty = True
+        if line is not None:
+            self.log_message(f"📡 ESP: {line}",
+                             logging.DEBUG if isinstance(event, CHATTER_EVENTS) else logging.INFO)
+        return scores_dirty
+    
+    def process_telemetry(self, event, latest):
+        """Processar telemetria de texto da ESP (evento LegacyTelemetry)"""
+        # Formato: p1T1,50,100 (carro 1, volta 1, posição 50, bateria 100)
+        car_num = event.car - 1  # Índice 0-based dos widgets
+        if 0 <= car_num < self.num_cars:
+            latest[car_num] = (event.position, event.lap)
+            self.log_message(f"📡 Carro {event.car}: Volta {event.lap}, Pos {event.position}, Bat {event.battery}",
+                             logging.DEBUG)
+    
+    def process_frame(self, frame, latest):
+        """Processar quadro binário de telemetria com todos os carros"""
+        for sample in frame.cars:
+            car_num = sample.car - 1  # Índice 0-based dos widgets
+            if 0 <= car_num < self.num_cars:
+                latest[car_num] = (int(sample.position), sample.laps)
     
     def update_car_position(self, car_num, pos, lap):
         """Atualizar posição do carro na visualização da pista"""
@@ -588,60 +662,87 @@ class OLRGUIConfig:
             # Calcular posição X na pista (400 pixels de largura)
             # Assumindo que a pista tem 200 LEDs, mapear posição para pixels
             track_width = 380  # Largura da pista no canvas
-            x = 10 + (pos % 200) * track_width / 200
+            x = round(10 + (pos % 200) * track_width / 200)
             
             # Calcular posição Y baseada na volta
             y = 30 + (lap - 1) * 15  # Cada volta em uma linha diferente
             
-            # Limpar posição anterior do carro
-            self.track_canvas.delete(f"car_{car_num}")
+            # Nada a fazer se o carro não mudou de pixel nem de volta
+            previous = self.car_drawn[car_num]
+            if previous == (x, y, lap):
+                return
             
-            # Cores dos carros
-            car_colors = ["#ff00ff", "#00ff00", "#0000ff", "#ffff00"]  # Carro 1 é magenta
-            
-            # Desenhar carro na nova posição
-            self.track_canvas.create_oval(x-8, y-8, x+8, y+8, 
-                                        fill=car_colors[car_num], outline="white", 
-                                        tags=f"car_{car_num}")
-            
-            # Adicionar número do carro
-            self.track_canvas.create_text(x, y, text=f"{car_num+1}", 
-                                        fill="black" if car_num == 3 else "white", 
-                                        font=("Arial", 8, "bold"), 
-                                        tags=f"car_{car_num}")
-            
-            # Adicionar indicador de volta
-            self.track_canvas.create_text(x, y+12, text=f"V{lap}", 
-                                        fill=car_colors[car_num], 
-                                        font=("Arial", 6, "bold"), 
-                                        tags=f"car_{car_num}")
+            canvas = self.track_canvas
+            oval, number, lap_text = self.car_items[car_num]
+            canvas.coords(oval, x-8, y-8, x+8, y+8)
+            canvas.coords(number, x, y)
+            canvas.coords(lap_text, x, y+12)
+            if previous is None:
+                canvas.itemconfig(f"car_{car_num}", state="normal")
+            if previous is None or previous[2] != lap:
+                canvas.itemconfig(lap_text, text=f"V{lap}")
+            self.car_drawn[car_num] = (x, y, lap)
             
         except Exception as e:
-            self.log_message(f"❌ Erro ao atualizar posição do carro {car_num}: {e}")
+            self.log_message(f"❌ Erro ao atualizar posição do carro {car_num}: {e}", logging.ERROR)
     
-    def log_message(self, message):
-        """Adicionar mensagem ao log"""
+    def log_message(self, message, level=logging.INFO):
+        """Adicionar mensagem ao log (inserida no widget no próximo quadro)"""
+        if level < self.log_level:
+            return
         timestamp = time.strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
+        self.log_buffer.append(f"[{timestamp}] {message}\n")
+    
+    def update_log_level(self):
+        """Mostrar ou esconder as linhas de telemetria no log"""
+        self.log_level = logging.DEBUG if self.show_telemetry.get() else logging.INFO
+    
+    def flush_log(self):
+        """Inserir as mensagens acumuladas de uma vez e descartar linhas antigas"""
+        if not self.log_buffer:
+            return
+        lines = self.log_buffer[-self.log_lines:]
+        self.log_buffer = []
+        
+        # Rolar para o fim só se o usuário não estiver lendo o histórico
+        follow = self.log_text.yview()[1] >= 0.999
+        self.log_text.insert(tk.END, "".join(lines))
+        count = int(self.log_text.index("end-1c").split(".")[0]) - 1
+        if count > self.log_lines:
+            # Remover em blocos para não apagar linhas a cada mensagem
+            remove = count - self.log_lines + min(LOG_TRIM_LINES, self.log_lines // 2)
+            self.log_text.delete("1.0", f"{remove + 1}.0")
+        if follow:
+            self.log_text.see(tk.END)
     
     def monitor_serial(self):
-        """Monitorar respostas da ESP"""
+        """Monitorar respostas da ESP
+        
+        Roda fora da thread do Tk: só decodifica, classifica e enfileira os
+        eventos com o instante de chegada; ui_frame aplica a fila.
+        """
+        decoder = StreamDecoder()
+        parser = LineParser()
+        events = self.events
         while self.running:
-            if self.ser and self.ser.in_waiting:
-                try:
-                    # Ler todas as linhas disponíveis
-                    while self.ser.in_waiting:
-                        response = self.ser.readline().decode().strip()
-                        if response:
-                            # Processar telemetria automaticamente
-                            if response.startswith('p') and 'T' in response:
-                                self.process_telemetry(response)
-                            else:
-                                self.log_message(f"📡 ESP: {response}")
-                except Exception as e:
-                    self.log_message(f"❌ Erro na leitura: {e}")
-            time.sleep(0.05)  # Mais rápido para melhor resposta
+            if not self.ser:
+                time.sleep(0.1)
+                continue
+            try:
+                # Bloqueia até chegar ao menos um byte e leva tudo o que houver
+                data = self.ser.read(max(1, self.ser.in_waiting))
+                if not data:
+                    continue
+                now = time.monotonic()
+                lines, frames = decoder.feed(data)
+                for response in lines:
+                    events.put((parser.parse(response), response, now))
+                if frames:
+                    # Apenas o quadro mais recente interessa à interface
+                    events.put((frames[-1], None, now))
+            except Exception as e:
+                events.put((None, f"❌ Erro na leitura: {e}", time.monotonic()))
+                time.sleep(0.1)
     
     def on_closing(self):
         """Função chamada quando a janela é fechada"""
@@ -670,7 +771,7 @@ def main():
     if len(sys.argv) > 1:
         port = sys.argv[1]
     
-    app = OLRGUIConfig(port=port)
+    app = OLRGUIConfig(port=port, num_cars=configured_num_cars())
     app.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Gravador e Replay de Corridas - Autorama LED Race Game
+Grava todos os bytes recebidos da ESP32 e todos os comandos enviados em um
+arquivo de captura binário, somente de acréscimo, e reproduz a captura como
+se fosse a porta serial (1×, 10× ou o mais rápido possível).
+
+Formato da captura (little-endian):
+    cabeçalho   b'ALRC', versão (B), 3 bytes livres, início (double, epoch)
+    registro    tipo (B: 1 = recebido, 2 = enviado), instante (I, em passos
+                de 100 µs desde o início), tamanho (H), bytes
+
+Ao lado da captura fica o índice "<captura>.idx", com um registro de 16 bytes
+por comando GO ('g') ou RESET ('r') enviado: marcador (c), 3 bytes livres,
+instante (I) e posição do registro na captura (Q). Achar a N-ésima corrida é
+um acesso direto ao índice seguido de um seek na captura.
+
+Replay no servidor: conectar à porta "replay://<captura>?speed=10&race=2"
+(speed=0 reproduz o mais rápido possível; race é 1-based).
+
+Uso: python race_recorder.py info <captura>
+"""
+
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+CAPTURE_MAGIC = b'ALRC'
+CAPTURE_VERSION = 1
+CAPTURE_TICK = 1e-4  # Resolução dos instantes (s)
+REPLAY_PREFIX = 'replay://'
+
+RECORD_RX = 1  # Bytes recebidos da ESP32
+RECORD_TX = 2  # Comandos enviados à ESP32
+RACE_MARKERS = b'grGR'  # GO e RESET (o firmware aceita as duas caixas) entram no índice
+
+_HEADER = struct.Struct('<4sB3xd')
+_RECORD = struct.Struct('<BIH')
+_INDEX = struct.Struct('<c3xIQ')
+_MAX_PAYLOAD = 0xFFFF
+_MAX_TICKS = 0xFFFFFFFF  # u32: ~4,97 dias de captura com CAPTURE_TICK
+_REPLAY_BUFFER = 65536  # Bytes adiantados pelo replay a cada leitura
+
+
+def index_path(path):
+    """Caminho do índice de corridas de uma captura"""
+    return f"{path}.idx"
+
+
+class RaceRecorder:
+    """Grava o tráfego serial em um arquivo de captura com índice de corridas"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Continuar uma captura existente com o mesmo relógio (validada antes de abrir)
+            with open(path, 'rb') as existing:
+                self.started = _read_header(existing)
+            self._file = open(path, 'ab')
+        else:
+            self.started = time.time()
+            self._file = open(path, 'ab')
+            self._file.write(_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, self.started))
+            self._file.flush()
+        try:
+            self._index = open(index_path(path), 'ab')
+        except OSError:
+            self._file.close()
+            raise
+        self.records = 0
+
+    def record_rx(self, data):
+        """Grava bytes recebidos da ESP32"""
+        self._record(RECORD_RX, data)
+
+    def record_tx(self, data):
+        """Grava um comando enviado, indexando GO e RESET"""
+        self._record(RECORD_TX, data)
+
+    def _record(self, kind, data):
+        # Limitado ao u32: capturas com mais de ~5 dias (ou relógio voltando) não quebram o pack
+        ticks = min(max(int((time.time() - self.started) / CAPTURE_TICK), 0), _MAX_TICKS)
+        with self._lock:
+            if self._file.closed:
+                return
+            for start in range(0, len(data), _MAX_PAYLOAD):
+                chunk = data[start:start + _MAX_PAYLOAD]
+                offset = self._file.tell()
+                self._file.write(_RECORD.pack(kind, ticks, len(chunk)))
+                self._file.write(chunk)
+                if kind == RECORD_TX:
+                    markers = [byte for byte in chunk if byte in RACE_MARKERS]
+                    for marker in markers:
+                        self._index.write(_INDEX.pack(bytes((marker,)).lower(), ticks, offset))
+                    if markers:
+                        self._index.flush()
+                self.records += 1
+            self._file.flush()
+
+    def close(self):
+        """Fecha a captura e o índice"""
+        with self._lock:
+            self._file.close()
+            self._index.close()
+
+
+def _read_header(file):
+    """Lê e valida o cabeçalho; retorna o instante de início"""
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError("Captura vazia ou truncada")
+    magic, version, started = _HEADER.unpack(header)
+    if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+        raise ValueError("Arquivo não é uma captura do autorama")
+    return started
+
+
+class CaptureReader:
+    """Leitura sequencial de uma captura e do seu índice de corridas"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.started = _read_header(self._file)
+        self.markers = self._load_index()
+        self.races = [offset for marker, _, offset in self.markers if marker == b'g']
+
+    def _load_index(self):
+        try:
+            with open(index_path(self.path), 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return []
+        usable = len(data) - len(data) % _INDEX.size
+        return list(_INDEX.iter_unpack(data[:usable]))
+
+    def seek_race(self, race):
+        """Posiciona a leitura no GO da corrida race (1-based)"""
+        if not 1 <= race <= len(self.races):
+            raise ValueError(f"Corrida {race} não existe na captura ({len(self.races)} gravadas)")
+        self._file.seek(self.races[race - 1])
+
+    def __iter__(self):
+        """Registros (tipo, instante em s desde o início, bytes) a partir da posição atual"""
+        read = self._file.read
+        while True:
+            header = read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            kind, ticks, size = _RECORD.unpack(header)
+            payload = read(size)
+            if len(payload) < size:
+                return  # Registro truncado no fim de uma captura em andamento
+            yield kind, ticks * CAPTURE_TICK, payload
+
+    def close(self):
+        self._file.close()
+
+
+class ReplaySerial:
+    """Transporte com a interface usada pelo SerialManager que reproduz uma captura
+
+    Só os bytes recebidos são reproduzidos, respeitando os intervalos
+    gravados divididos por speed (0 = sem espera). Comandos escritos são
+    aceitos e descartados: as respostas vêm da própria captura.
+    """
+
+    def __init__(self, path, speed=1.0, race=None, timeout=0.1):
+        self.port = path
+        self.speed = speed
+        self.timeout = timeout
+        self._capture = CaptureReader(path)
+        if race is not None:
+            self._capture.seek_race(race)
+        self._records = (record for record in self._capture if record[0] == RECORD_RX)
+        self._next = next(self._records, None)
+        self._origin = None  # (relógio local, instante da captura) do primeiro registro
+        self._buffer = bytearray()
+        self.is_open = True
+
+    @classmethod
+    def from_url(cls, url, timeout=0.1):
+        """Cria o replay a partir de "replay://<captura>?speed=10&race=2\""""
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        speed = float(query.get('speed', ['1'])[0])
+        race = int(query['race'][0]) if 'race' in query else None
+        return cls(parts.netloc + parts.path, speed=speed, race=race, timeout=timeout)
+
+    def _pump(self):
+        """Move para o buffer os registros já devidos; retorna a espera até o próximo"""
+        while self._next is not None and len(self._buffer) < _REPLAY_BUFFER:
+            _, moment, payload = self._next
+            if self._origin is None:
+                self._origin = (time.monotonic(), moment)
+            if self.speed > 0:
+                due = self._origin[0] + (moment - self._origin[1]) / self.speed
+                wait = due - time.monotonic()
+                if wait > 0:
+                    return wait
+            self._buffer += payload
+            self._next = next(self._records, None)
+        return None
+
+    @property
+    def in_waiting(self):
+        self._pump()
+        return len(self._buffer)
+
+    def read(self, size=1):
+        """Bloqueia até timeout esperando bytes, como serial.Serial.read"""
+        deadline = time.monotonic() + self.timeout
+        while self.is_open:
+            wait = self._pump()
+            if self._buffer:
+                data = bytes(self._buffer[:size])
+                del self._buffer[:size]
+                return data
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, wait) if wait is not None else remaining)
+        return b''
+
+    def write(self, data):
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+        self._capture.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gravador e replay de corridas do autorama")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    info = subparsers.add_parser('info', help='resumo de uma captura')
+    info.add_argument('capture')
+    args = parser.parse_args()
+
+    capture = CaptureReader(args.capture)
+    counts = {RECORD_RX: [0, 0], RECORD_TX: [0, 0]}
+    duration = 0.0
+    for kind, moment, payload in capture:
+        counts[kind][0] += 1
+        counts[kind][1] += len(payload)
+        duration = moment
+    capture.close()
+
+    started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(capture.started))
+    print(f"🎬 Captura: {args.capture} (início {started}, {duration:.1f} s)")
+    print(f"📥 Recebidos: {counts[RECORD_RX][0]} registros, {counts[RECORD_RX][1]} bytes")
+    print(f"📤 Enviados: {counts[RECORD_TX][0]} registros, {counts[RECORD_TX][1]} bytes")
+    print(f"🏁 Corridas: {len(capture.races)}")
+    for number, (marker, ticks, offset) in enumerate(capture.markers, 1):
+        label = 'GO' if marker == b'g' else 'RESET'
+        print(f"   {number:>3}. {label:<5} em {ticks * CAPTURE_TICK:>9.1f} s (offset {offset})")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Sequências de Teste - Autorama LED Race Game
+Executa sequências declarativas de passos (enviar um comando, esperar um
+evento do firmware ou um timeout, registrar o resultado) sem bloquear a
+interface: nada aqui dorme. O runner é guiado por dois estímulos externos,
+os eventos do LineParser (feed) e um temporizador (schedule, por exemplo
+root.after do Tk), e ambos devem vir da mesma thread.
+
+Cada passo avança assim que o evento esperado chega, então a duração de uma
+sequência é a latência real do firmware e não uma soma de pausas fixas.
+"""
+
+import time
+from typing import Callable, NamedTuple, Optional
+
+from autorama_protocol import CarAccelerated, RaceStarted, RaceStatus, SpeedChanged
+
+STEP_TIMEOUT = 1.0  # Espera padrão pelo evento de um passo (s)
+CAR_COMMANDS = ['a', '2', 'd', 'f']  # Acelerador de cada carro no firmware
+
+
+class Step(NamedTuple):
+    """Um passo: pausa opcional, comando opcional e evento esperado opcional"""
+    label: str
+    send: Optional[str] = None
+    expect: Optional[Callable] = None  # evento -> bool; None = passo sem espera
+    timeout: float = STEP_TIMEOUT
+    delay: float = 0.0  # Pausa antes do passo (s)
+
+
+class StepResult(NamedTuple):
+    label: str
+    ok: bool
+    latency: Optional[float]  # Envio -> evento esperado (s)
+    detail: str
+
+
+def expect_event(kind, **fields):
+    """Predicado que aceita eventos do tipo kind com os campos indicados"""
+    def matches(event):
+        return isinstance(event, kind) and all(
+            getattr(event, name) == value for name, value in fields.items())
+    matches.description = kind.__name__ + (
+        f"({', '.join(f'{name}={value}' for name, value in fields.items())})" if fields else '')
+    return matches
+
+
+def all_cars_sequence():
+    """GO seguido de uma aceleração de cada carro, esperando o firmware confirmar"""
+    steps = [Step("Iniciar corrida", send='g', expect=expect_event(RaceStarted))]
+    for car, command in enumerate(CAR_COMMANDS, 1):
+        steps.append(Step(f"Carro {car} ('{command}')", send=command,
+                          expect=expect_event(CarAccelerated, car=car)))
+    return steps
+
+
+def car_1_sequence(attempts=3):
+    """Status, GO, status com corrida ativa e acelerações do carro 1"""
+    steps = [
+        Step("Status inicial", send='s', expect=expect_event(RaceStatus)),
+        Step("Iniciar corrida", send='g', expect=expect_event(RaceStarted)),
+        Step("Corrida ativa após GO", send='s', expect=expect_event(RaceStatus, active=True)),
+    ]
+    for attempt in range(1, attempts + 1):
+        steps.append(Step(f"Tentativa {attempt} - Carro 1 acelerando", send='a',
+                          expect=expect_event(SpeedChanged, car=1)))
+    return steps
+
+
+class SequenceRunner:
+    """Executa uma sequência por vez guiada por eventos e temporizador
+
+    send(comando) envia ao firmware, schedule(segundos, função) agenda uma
+    chamada, on_step(resultado) e on_done(nome, resultados) informam o
+    progresso. Os instantes vêm de clock (time.monotonic por padrão).
+    """
+
+    def __init__(self, send, schedule, on_step=None, on_done=None, clock=time.monotonic):
+        self._send = send
+        self._schedule = schedule
+        self._on_step = on_step
+        self._on_done = on_done
+        self._clock = clock
+        self.name = None
+        self.results = []
+        self._steps = iter(())
+        self._waiting = None  # Passo aguardando o evento
+        self._sent_at = 0.0
+        self._generation = 0  # Invalida temporizadores de passos já resolvidos
+
+    @property
+    def running(self):
+        return self.name is not None
+
+    def start(self, name, steps):
+        """Inicia uma sequência; retorna False se outra estiver em andamento"""
+        if self.running:
+            return False
+        self.name = name
+        self.results = []
+        self._steps = iter(steps)
+        self._next()
+        return True
+
+    def cancel(self):
+        """Interrompe a sequência atual registrando o passo pendente como falha"""
+        if not self.running:
+            return
+        if self._waiting is not None:
+            self._finish_step(False, None, "cancelado")
+        self._steps = iter(())
+        self._complete()
+
+    def feed(self, event, now=None):
+        """Entrega um evento do firmware (now = instante de chegada)"""
+        step = self._waiting
+        if step is None:
+            return
+        now = self._clock() if now is None else now
+        # Eventos que chegaram antes do envio (ainda na fila da interface) não contam
+        if now < self._sent_at or not step.expect(event):
+            return
+        self._finish_step(True, now - self._sent_at, "ok")
+        self._next()
+
+    def _next(self):
+        step = next(self._steps, None)
+        if step is None:
+            self._complete()
+            return
+        self._generation += 1
+        if step.delay:
+            generation = self._generation
+            self._schedule(step.delay, lambda: self._run(step, generation))
+        else:
+            self._run(step, self._generation)
+
+    def _run(self, step, generation):
+        if generation != self._generation:
+            return  # Sequência cancelada durante a pausa
+        self._sent_at = self._clock()
+        if step.send is not None:
+            try:
+                self._send(step.send)
+            except Exception as e:
+                self._record(step, False, None, f"falha ao enviar: {e}")
+                self._next()
+                return
+        if step.expect is None:
+            self._record(step, True, None, "enviado" if step.send is not None else "ok")
+            self._next()
+            return
+        self._waiting = step
+        self._schedule(step.timeout, lambda: self._expire(generation))
+
+    def _expire(self, generation):
+        if generation != self._generation or self._waiting is None:
+            return  # O evento chegou antes do timeout
+        description = getattr(self._waiting.expect, 'description', 'evento')
+        self._finish_step(False, None, f"sem {description} em {self._waiting.timeout:.1f} s")
+        self._next()
+
+    def _finish_step(self, ok, latency, detail):
+        step, self._waiting = self._waiting, None
+        self._generation += 1
+        self._record(step, ok, latency, detail)
+
+    def _record(self, step, ok, latency, detail):
+        result = StepResult(step.label, ok, latency, detail)
+        self.results.append(result)
+        if self._on_step:
+            self._on_step(result)
+
+    def _complete(self):
+        name, self.name = self.name, None
+        self._generation += 1
+        if self._on_done:
+            self._on_done(name, list(self.results))
+
+
+def format_result(result):
+    """Linha de relatório de um passo"""
+    if result.ok and result.latency is not None:
+        return f"✅ {result.label}: {result.latency * 1000:.1f} ms"
+    if result.ok:
+        return f"✅ {result.label}: {result.detail}"
+    return f"⚠️ {result.label}: {result.detail}"
+
+
+def summarize(name, results):
+    """Resumo de uma sequência: aprovados, falhas e latências"""
+    passed = sum(result.ok for result in results)
+    latencies = sorted(result.latency for result in results if result.latency is not None)
+    summary = f"{name}: {passed}/{len(results)} passos ok"
+    if latencies:
+        summary += (f", latência média {sum(latencies) / len(latencies) * 1000:.1f} ms"
+                    f", máxima {latencies[-1] * 1000:.1f} ms")
+    return summary
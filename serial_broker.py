@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Broker Serial - Autorama LED Race Game
+Processo dono exclusivo da porta da ESP32 que distribui o tráfego para vários
+front-ends locais (servidor web, interface Tkinter, outros workers) por um
+socket Unix.
+
+Uma única thread lê a porta e separa o fluxo em linhas e quadros de
+telemetria validados (StreamDecoder); cada registro vira uma mensagem
+enviada a todos os clientes. O eco "📡 Comando: x" vai só para o cliente que
+enviou o comando, para que um front-end não confirme comandos de outro.
+Cada cliente tem uma fila limitada: um cliente lento perde mensagens
+inteiras (contadas), nunca atrasa a leitura da porta nem os demais.
+
+Mensagem (little-endian): tipo (B), tamanho (H), bytes
+    broker -> cliente   1 = linha de texto (UTF-8, sem a quebra de linha)
+                        2 = quadro de telemetria binário
+    cliente -> broker   3 = caracteres de comando
+
+Clientes: conectar à porta "broker://<socket>" no servidor ou na interface
+("broker://" sozinho usa o socket padrão). BrokerSerial oferece a interface
+de serial.Serial e entrega os registros de novo como bytes da serial.
+
+Uso: python serial_broker.py /dev/ttyUSB0 [--socket /tmp/autorama-broker.sock]
+"""
+
+import argparse
+import logging
+import os
+import queue
+import select
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+import serial
+
+from autorama_protocol import ECHO_PREFIX, StreamDecoder, encode_frame
+from log_pipeline import setup_logging
+from serial_ports import Backoff
+
+BROKER_PREFIX = 'broker://'
+BROKER_SOCKET = os.path.join(tempfile.gettempdir(), 'autorama-broker.sock')
+
+MSG_LINE = 1  # Linha de texto da ESP32
+MSG_FRAME = 2  # Quadro de telemetria binário
+MSG_COMMAND = 3  # Comando de um cliente para a ESP32
+
+CLIENT_QUEUE = 4096  # Mensagens aguardando cada cliente antes de descartar
+ECHO_TIMEOUT = 2.0  # Tempo para o eco de um comando voltar ao cliente que o enviou (s)
+READ_TIMEOUT = 0.1  # Timeout de leitura da porta (s)
+
+_MESSAGE = struct.Struct('<BH')
+_MAX_PAYLOAD = 0xFFFF
+_RECV_SIZE = 65536
+_SEND_BATCH = 256  # Mensagens reunidas em um único sendall
+
+logger = logging.getLogger(__name__)
+
+
+def pack_message(kind, payload):
+    """Mensagem do protocolo do broker (payloads maiores são divididos)"""
+    if len(payload) <= _MAX_PAYLOAD:
+        return _MESSAGE.pack(kind, len(payload)) + payload
+    return b''.join(pack_message(kind, payload[start:start + _MAX_PAYLOAD])
+                    for start in range(0, len(payload), _MAX_PAYLOAD))
+
+
+def unpack_messages(buffer):
+    """Retira do bytearray as mensagens completas; retorna [(tipo, bytes)]"""
+    messages = []
+    offset = 0
+    while len(buffer) - offset >= _MESSAGE.size:
+        kind, size = _MESSAGE.unpack_from(buffer, offset)
+        end = offset + _MESSAGE.size + size
+        if end > len(buffer):
+            break
+        messages.append((kind, bytes(buffer[offset + _MESSAGE.size:end])))
+        offset = end
+    del buffer[:offset]
+    return messages
+
+
+class _Client:
+    """Conexão de um front-end com fila de saída limitada"""
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.name = name
+        self.outbox = queue.Queue(CLIENT_QUEUE)
+        self.dropped = 0
+
+    def send(self, message):
+        """Enfileira sem bloquear; com a fila cheia a mensagem é descartada"""
+        try:
+            self.outbox.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SerialBroker:
+    """Dono da porta serial: uma leitora, uma escritora e N clientes locais"""
+
+    def __init__(self, port, socket_path=BROKER_SOCKET, baudrate=115200):
+        self.port = port
+        self.socket_path = socket_path
+        self.baudrate = baudrate
+        self.connection = None
+        # Lista imutável: trocada inteira (sob o lock) a cada entrada ou saída, para
+        # que _broadcast percorra uma cópia estável sem travar
+        self._clients = []
+        self._clients_lock = threading.Lock()
+        self._commands = queue.Queue()  # (bytes, cliente) na ordem de chegada
+        self._echo_owners = deque()  # (caractere, cliente, prazo) na ordem de escrita
+        self._echo_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listener = None
+        self._next_client = 1
+
+    @property
+    def clients(self):
+        return len(self._clients)
+
+    def serve_forever(self):
+        """Abre o socket, inicia as threads da porta e aceita clientes até stop()"""
+        self._listener = self._listen()
+        logger.info(f"📡 Broker da porta {self.port} em {BROKER_PREFIX}{self.socket_path}")
+        for target, name in ((self._serial_loop, 'broker-serial-reader'),
+                             (self._writer_loop, 'broker-serial-writer')):
+            threading.Thread(target=target, name=name, daemon=True).start()
+        try:
+            while not self._stop.is_set():
+                try:
+                    sock, _ = self._listener.accept()
+                except OSError:
+                    break  # Socket fechado por stop()
+                self._add_client(sock)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Desconecta os clientes, fecha a porta e remove o socket"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._commands.put(None)
+        if self._listener:
+            self._listener.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        with self._clients_lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            self._close_client(client)
+        if self.connection:
+            self.connection.close()
+
+    def _listen(self):
+        """Socket de escuta; recusa iniciar se outro broker já atende no caminho"""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)  # Sobra de um broker encerrado
+            else:
+                raise RuntimeError(f"Outro broker já atende em {self.socket_path}")
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Só o usuário do broker envia comandos: o socket já nasce 0600 (um
+        # chmod depois do bind deixaria uma janela aberta no diretório temporário)
+        umask = os.umask(0o177)
+        try:
+            listener.bind(self.socket_path)
+        except OSError:
+            listener.close()
+            raise
+        finally:
+            os.umask(umask)
+        listener.listen()
+        return listener
+
+    def _add_client(self, sock):
+        client = _Client(sock, f'cliente-{self._next_client}')
+        self._next_client += 1
+        with self._clients_lock:
+            self._clients = self._clients + [client]
+        threading.Thread(target=self._client_reader, args=(client,),
+                         name=f'broker-{client.name}-reader', daemon=True).start()
+        threading.Thread(target=self._client_writer, args=(client,),
+                         name=f'broker-{client.name}-writer', daemon=True).start()
+        logger.info(f"🔗 {client.name} conectado ({self.clients} cliente(s))")
+
+    def _remove_client(self, client):
+        with self._clients_lock:
+            if client not in self._clients:
+                return
+            self._clients = [other for other in self._clients if other is not client]
+        self._close_client(client)
+        logger.info(f"🔗 {client.name} desconectado ({client.dropped} mensagens descartadas, "
+                    f"{self.clients} cliente(s))")
+
+    def _close_client(self, client):
+        try:
+            client.outbox.put_nowait(None)
+        except queue.Full:
+            pass  # Com o socket fechado o sendall da escritora falha e ela encerra
+        try:
+            client.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        client.sock.close()
+
+    def _client_reader(self, client):
+        """Recebe os comandos de um cliente"""
+        buffer = bytearray()
+        while True:
+            try:
+                data = client.sock.recv(_RECV_SIZE)
+            except OSError:
+                data = b''
+            if not data:
+                self._remove_client(client)
+                return
+            buffer += data
+            for kind, payload in unpack_messages(buffer):
+                if kind == MSG_COMMAND:
+                    self._commands.put((payload, client))
+
+    def _client_writer(self, client):
+        """Envia a fila de um cliente, reunindo o que já estiver pendente"""
+        while True:
+            message = client.outbox.get()
+            if message is None:
+                return
+            batch = [message]
+            while len(batch) < _SEND_BATCH:
+                try:
+                    message = client.outbox.get_nowait()
+                except queue.Empty:
+                    break
+                if message is None:
+                    return
+                batch.append(message)
+            try:
+                client.sock.sendall(b''.join(batch))
+            except OSError:
+                self._remove_client(client)
+                return
+
+    def _broadcast(self, message):
+        for client in self._clients:  # Retrato da lista: saídas no meio não pulam ninguém
+            client.send(message)
+
+    def _open(self):
+        """Abre a porta com recuo exponencial até conseguir ou o broker parar"""
+        backoff = Backoff()
+        while not self._stop.is_set():
+            try:
+                return serial.Serial(port=self.port, baudrate=self.baudrate,
+                                     timeout=READ_TIMEOUT, write_timeout=1)
+            except Exception as e:
+                delay = backoff.next()
+                logger.warning(f"Erro ao abrir {self.port}: {e}; nova tentativa em {delay:.1f} s")
+                self._stop.wait(delay)
+        return None
+
+    def _serial_loop(self):
+        """Thread leitora: única dona das leituras da porta; reabre se ela cair"""
+        while not self._stop.is_set():
+            connection = self._open()
+            if connection is None:
+                return
+            self.connection = connection
+            logger.info(f"✅ Porta {self.port} aberta")
+            decoder = StreamDecoder()
+            while not self._stop.is_set():
+                try:
+                    raw = connection.read(max(1, connection.in_waiting))
+                except Exception as e:
+                    if not self._stop.is_set():
+                        logger.error(f"Erro ao ler {self.port}: {e}")
+                    break
+                if raw:
+                    lines, frames = decoder.feed(raw)
+                    self._publish(lines, frames)
+            self.connection = None
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _publish(self, lines, frames):
+        for line in lines:
+            message = pack_message(MSG_LINE, line.encode('utf-8'))
+            owner = self._echo_owner(line[len(ECHO_PREFIX):]) if line.startswith(ECHO_PREFIX) else None
+            if owner is not None:
+                owner.send(message)
+            else:
+                self._broadcast(message)
+        for frame in frames:
+            self._broadcast(pack_message(MSG_FRAME, encode_frame(frame)))
+
+    def _echo_owner(self, char):
+        """Cliente que enviou o comando ecoado (None = todos recebem o eco)
+
+        O firmware ecoa na ordem de escrita, então entradas anteriores à
+        correspondente perderam o eco e são descartadas.
+        """
+        now = time.monotonic()
+        with self._echo_lock:
+            owners = self._echo_owners
+            while owners and owners[0][2] <= now:
+                owners.popleft()
+            for index, (expected, _, _) in enumerate(owners):
+                if expected == char:
+                    break
+            else:
+                return None
+            for _ in range(index):
+                owners.popleft()
+            _, client, _ = owners.popleft()
+        return client if client in self._clients else None
+
+    def _writer_loop(self):
+        """Thread escritora: grava os comandos de todos os clientes na ordem de chegada"""
+        while True:
+            item = self._commands.get()
+            if item is None:
+                return
+            items = [item]
+            while True:
+                try:
+                    item = self._commands.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    return
+                items.append(item)
+
+            connection = self.connection
+            if connection is None:
+                logger.warning(f"Porta {self.port} fechada; {len(items)} comando(s) descartado(s)")
+                continue
+            deadline = time.monotonic() + ECHO_TIMEOUT
+            with self._echo_lock:
+                for payload, client in items:
+                    for char in payload.decode('utf-8', 'replace'):
+                        if not char.isspace():
+                            self._echo_owners.append((char, client, deadline))
+            try:
+                connection.write(b''.join(payload for payload, _ in items))
+            except Exception as e:
+                logger.error(f"Erro ao escrever em {self.port}: {e}")
+
+
+class BrokerSerial:
+    """Transporte com a interface usada pelo SerialManager ligado a um broker
+
+    As mensagens recebidas voltam a ser bytes da serial (linhas com "\\n" e
+    quadros binários), então o StreamDecoder do cliente funciona sem mudanças.
+    """
+
+    def __init__(self, path=BROKER_SOCKET, timeout=0.1):
+        self.port = BROKER_PREFIX + path
+        self.timeout = timeout
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._incoming = bytearray()  # Mensagens ainda incompletas
+        self._buffer = bytearray()  # Bytes da serial prontos para read()
+        self._write_lock = threading.Lock()
+        self.is_open = True
+
+    @classmethod
+    def from_url(cls, url, timeout=0.1):
+        """Conecta a "broker://<socket>" ("broker://" usa BROKER_SOCKET)"""
+        return cls(url[len(BROKER_PREFIX):] or BROKER_SOCKET, timeout=timeout)
+
+    def _receive(self, timeout):
+        """Lê o que o broker enviou, esperando até timeout por alguma coisa"""
+        readable, _, _ = select.select([self._sock], [], [], timeout)
+        if not readable:
+            return
+        data = self._sock.recv(_RECV_SIZE)
+        if not data:
+            raise ConnectionError("Broker encerrou a conexão")
+        self._incoming += data
+        for kind, payload in unpack_messages(self._incoming):
+            if kind == MSG_LINE:
+                self._buffer += payload
+                self._buffer += b'\n'
+            elif kind == MSG_FRAME:
+                self._buffer += payload
+
+    @property
+    def in_waiting(self):
+        if not self._buffer:
+            self._receive(0)
+        return len(self._buffer)
+
+    def read(self, size=1):
+        """Bloqueia até timeout esperando bytes, como serial.Serial.read"""
+        if not self._buffer:
+            self._receive(self.timeout)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def write(self, data):
+        with self._write_lock:
+            self._sock.sendall(pack_message(MSG_COMMAND, bytes(data)))
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+        self._sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broker da porta serial do autorama")
+    parser.add_argument('port', help='porta serial da ESP32 (ex.: /dev/ttyUSB0)')
+    parser.add_argument('--socket', default=BROKER_SOCKET, help='caminho do socket Unix')
+    parser.add_argument('--baudrate', type=int, default=115200)
+    parser.add_argument('--log', help='arquivo de log (padrão: só o terminal)')
+    args = parser.parse_args()
+
+    setup_logging(args.log)
+
+    broker = SerialBroker(args.port, args.socket, args.baudrate)
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("🛑 Broker parado pelo usuário")
+    except RuntimeError as e:
+        logger.error(f"❌ {e}")
+        return 1
+    finally:
+        broker.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Portas Seriais - Autorama LED Race Game
+Enumeração de portas em cache e recuo exponencial para a reconexão.
+
+serial.tools.list_ports.comports() percorre o sysfs (ou o registro, no
+Windows) e leva de milissegundos a dezenas de milissegundos. O PortCache só
+refaz a enumeração quando o diretório /dev muda (uma placa foi ligada ou
+removida) ou quando o resultado fica velho demais, e nunca deixa duas threads
+enumerando ao mesmo tempo: enquanto uma atualiza, as demais recebem a lista
+anterior em vez de esperar.
+"""
+
+import os
+import threading
+import time
+
+import serial.tools.list_ports
+
+DEV_DIR = '/dev'  # Entradas criadas e removidas a cada placa ligada ou desligada
+PORT_CACHE_MAX_AGE = 30.0  # Idade máxima da lista sem /dev (Windows) ou sem mudança (s)
+RECONNECT_INITIAL = 0.1  # Primeira espera entre tentativas de reconexão (s)
+RECONNECT_MAX = 5.0  # Espera máxima entre tentativas (s)
+
+# hwid informado para portas sem dispositivo USB por trás (pty, porta virtual)
+NO_HWID = ('', 'n/a')
+
+
+class PortCache:
+    """Lista de portas seriais atualizada quando os dispositivos mudam"""
+
+    def __init__(self, enumerate_ports=serial.tools.list_ports.comports, dev_dir=DEV_DIR,
+                 max_age=PORT_CACHE_MAX_AGE, clock=time.monotonic):
+        self._enumerate = enumerate_ports
+        self._dev_dir = dev_dir
+        self.max_age = max_age
+        self._clock = clock
+        self._ports = None  # Última enumeração (lista de dicts)
+        self._signature = None  # mtime de /dev na última enumeração
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def _dev_signature(self):
+        try:
+            return os.stat(self._dev_dir).st_mtime_ns
+        except OSError:
+            return None  # Sem /dev: só a idade máxima dispara a atualização
+
+    def _stale(self, signature):
+        return (self._ports is None or signature != self._signature
+                or self._clock() - self._refreshed_at > self.max_age)
+
+    def ports(self, refresh=False):
+        """Portas disponíveis: device, description, manufacturer e hwid"""
+        signature = self._dev_signature()
+        if not (refresh or self._stale(signature)):
+            return self._ports
+        if not self._lock.acquire(blocking=self._ports is None):
+            return self._ports  # Outra thread já está enumerando
+        try:
+            if refresh or self._stale(signature):
+                self._ports = [{
+                    'device': port.device,
+                    'description': port.description,
+                    'manufacturer': port.manufacturer,
+                    'hwid': port.hwid
+                } for port in self._enumerate()]
+                self._signature = signature
+                self._refreshed_at = self._clock()
+                self.refreshes += 1
+            return self._ports
+        finally:
+            self._lock.release()
+
+    def hwid(self, device):
+        """hwid do dispositivo ou None se ele não identifica uma placa"""
+        target = os.path.realpath(device)  # /dev/serial/by-id/... aponta para o ttyUSB
+        for port in self.ports():
+            if port['device'] in (device, target):
+                return None if port['hwid'] in NO_HWID else port['hwid']
+        return None
+
+    def find(self, hwid, refresh=False):
+        """Device atual da placa com esse hwid (o nome pode mudar ao religar)"""
+        for port in self.ports(refresh):
+            if port['hwid'] == hwid:
+                return port['device']
+        return None
+
+
+class Backoff:
+    """Esperas exponenciais entre tentativas: initial, 2×initial, ... até maximum"""
+
+    def __init__(self, initial=RECONNECT_INITIAL, maximum=RECONNECT_MAX):
+        self.initial = initial
+        self.maximum = maximum
+        self._next = initial
+
+    def next(self):
+        delay = self._next
+        self._next = min(self._next * 2, self.maximum)
+        return delay
+
+    def reset(self):
+        self._next = self.initial
@@ -21,6 +21,24 @@ int car_laps[4] = {0, 0, 0, 0}; // Voltas de cada carro
 int winner = -1; // Vencedor (-1 = sem vencedor)
 const int TOTAL_LAPS = 5; // Corrida termina em 5 voltas
 
+// Temporização do loop
+#define NUM_CARS 4
+#define PHYSICS_INTERVAL_MS 50   // Física e LEDs a 20 FPS
+
+// Telemetria binária (formato documentado em autorama_protocol.py)
+#define TELEMETRY_HZ 50          // Quadros por segundo com corrida ativa
+#define TELEMETRY_IDLE_HZ 2      // Quadros por segundo com corrida parada
+#define FRAME_SYNC1 0xAA
+#define FRAME_SYNC2 0x55
+#define FRAME_VERSION 1
+#define FRAME_HEADER_SIZE 12
+#define FRAME_CAR_SIZE 6
+#define FRAME_SIZE (FRAME_HEADER_SIZE + FRAME_CAR_SIZE * NUM_CARS + 2)
+
+unsigned long last_physics_ms = 0;
+unsigned long last_telemetry_ms = 0;
+uint16_t telemetry_seq = 0;
+
 void setup() {
   Serial.begin(115200);
   Serial.println("🚀 OLR ESP32 - JOGO COMPLETO");
@@ -89,20 +107,84 @@ void setup() {
 }
 
 void loop() {
-  // Processar comandos seriais
-  if (Serial.available()) {
+  // Processar todos os comandos seriais pendentes
+  while (Serial.available()) {
     char cmd = Serial.read();
+    // Ignorar quebras de linha e espaços enviados por terminais
+    if (cmd == '\n' || cmd == '\r' || cmd == ' ') {
+      continue;
+    }
     processCommand(cmd);
   }
   
+  unsigned long now = millis();
+  
   // Atualizar jogo se corrida iniciada
-  if (race_started) {
+  if (race_started && now - last_physics_ms >= PHYSICS_INTERVAL_MS) {
+    last_physics_ms = now;
     updateGame();
     drawGame();
     FastLED.show();
   }
   
-  delay(50); // 20 FPS
+  // Enviar telemetria na taxa configurada
+  unsigned long telemetry_interval = 1000 / (race_started ? TELEMETRY_HZ : TELEMETRY_IDLE_HZ);
+  if (now - last_telemetry_ms >= telemetry_interval) {
+    last_telemetry_ms = now;
+    sendTelemetryFrame();
+  }
+  
+  delay(1);
+}
+
+// CRC-16/CCITT-FALSE (polinômio 0x1021, valor inicial 0xFFFF)
+uint16_t crc16(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Quadro binário com o estado de todos os carros
+void sendTelemetryFrame() {
+  uint8_t frame[FRAME_SIZE];
+  uint32_t now = millis();
+  
+  frame[0] = FRAME_SYNC1;
+  frame[1] = FRAME_SYNC2;
+  frame[2] = FRAME_VERSION;
+  frame[3] = NUM_CARS;
+  frame[4] = telemetry_seq & 0xFF;
+  frame[5] = telemetry_seq >> 8;
+  frame[6] = now & 0xFF;
+  frame[7] = (now >> 8) & 0xFF;
+  frame[8] = (now >> 16) & 0xFF;
+  frame[9] = (now >> 24) & 0xFF;
+  frame[10] = race_started ? 0x01 : 0x00;
+  frame[11] = winner + 1; // 0 = sem vencedor
+  
+  for (int i = 0; i < NUM_CARS; i++) {
+    uint8_t *car = frame + FRAME_HEADER_SIZE + i * FRAME_CAR_SIZE;
+    uint16_t position = (uint16_t)(car_positions[i] * 100);
+    uint16_t speed = (uint16_t)(car_speeds[i] * 100);
+    car[0] = position & 0xFF;
+    car[1] = position >> 8;
+    car[2] = speed & 0xFF;
+    car[3] = speed >> 8;
+    car[4] = (uint8_t)car_laps[i];
+    car[5] = 0;
+  }
+  
+  uint16_t crc = crc16(frame + 2, FRAME_SIZE - 4);
+  frame[FRAME_SIZE - 2] = crc & 0xFF;
+  frame[FRAME_SIZE - 1] = crc >> 8;
+  
+  Serial.write(frame, FRAME_SIZE);
+  telemetry_seq++;
 }
 
 void processCommand(char cmd) {
@@ -4,13 +4,27 @@
 Inicia o servidor Flask e abre a interface web moderna
 """
 
+import importlib.util
 import os
 import sys
 import time
+import threading
+import urllib.request
 import webbrowser
 import subprocess
 from pathlib import Path
 
+SERVER_URL = f"http://localhost:{os.environ.get('AUTORAMA_PORT', 8000)}"
+SERVER_START_TIMEOUT = 15.0  # Espera máxima até /api/test responder (s)
+SERVER_POLL_INTERVAL = 0.05  # Intervalo entre tentativas em /api/test (s)
+
+# Pacote pip -> módulo importado (pyserial instala o módulo "serial")
+REQUIRED_PACKAGES = {
+    'flask': 'flask',
+    'pyserial': 'serial',
+    'flask-cors': 'flask_cors',
+}
+
 def print_banner():
     """Exibe banner do projeto"""
     print("=" * 60)
@@ -45,14 +59,13 @@ def check_dependencies():
     """Verifica se as dependências estão instaladas"""
     print("\n🔍 Verificando dependências...")
     
-    required_packages = ['flask', 'pyserial', 'flask-cors']
     missing_packages = []
     
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
+    for package, module in REQUIRED_PACKAGES.items():
+        # find_spec só localiza o módulo, sem o custo de importá-lo
+        if importlib.util.find_spec(module) is not None:
             print(f"✅ {package} - OK")
-        except ImportError:
+        else:
             missing_packages.append(package)
             print(f"❌ {package} - FALTANDO")
     
@@ -70,26 +83,47 @@ def check_dependencies():
     
     return True
 
+def wait_server_ready(process, timeout=SERVER_START_TIMEOUT):
+    """Aguarda /api/test responder; False se o processo morrer ou o prazo acabar"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{SERVER_URL}/api/test", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass  # Ainda não está escutando
+        time.sleep(SERVER_POLL_INTERVAL)
+    return False
+
+def discard_output(stream):
+    """Consome a saída do servidor para o pipe nunca encher e travá-lo"""
+    for _ in stream:
+        pass
+
 def start_flask_server():
     """Inicia o servidor Flask"""
     print("\n🌐 Iniciando servidor Flask...")
     
     try:
         # Iniciar servidor Flask em background
+        started = time.monotonic()
         process = subprocess.Popen([
             sys.executable, "web_server_robust.py"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         
-        # Aguardar um pouco para o servidor inicializar
-        time.sleep(3)
-        
-        # Verificar se o processo está rodando
-        if process.poll() is None:
-            print("✅ Servidor Flask iniciado com sucesso!")
-            print("🌐 URL: http://localhost:8000")
-            print("📱 Interface moderna: http://localhost:8000/web_interface.html")
+        # Pronto quando a API responde, não após uma pausa fixa
+        if wait_server_ready(process):
+            threading.Thread(target=discard_output, args=(process.stderr,), daemon=True).start()
+            print(f"✅ Servidor Flask iniciado com sucesso em {time.monotonic() - started:.1f} s!")
+            print(f"🌐 URL: {SERVER_URL}")
+            print(f"📱 Interface moderna: {SERVER_URL}/web_interface.html")
             return process
         else:
+            if process.poll() is None:
+                process.terminate()
             stdout, stderr = process.communicate()
             print("❌ Erro ao iniciar servidor Flask:")
             print(stderr.decode())
@@ -104,23 +138,20 @@ def open_browser():
     print("\n🌐 Abrindo navegador...")
     
     try:
-        # Aguardar um pouco mais para o servidor estar pronto
-        time.sleep(2)
-        
-        # Abrir navegador na interface moderna
-        webbrowser.open('http://localhost:8000/web_interface.html')
+        # Abrir navegador na interface moderna (o servidor já respondeu)
+        webbrowser.open(f'{SERVER_URL}/web_interface.html')
         print("✅ Navegador aberto na interface moderna!")
         
     except Exception as e:
         print(f"⚠️  Não foi possível abrir o navegador automaticamente: {e}")
-        print("💡 Abra manualmente: http://localhost:8000/web_interface.html")
+        print(f"💡 Abra manualmente: {SERVER_URL}/web_interface.html")
 
 def show_controls():
     """Mostra controles disponíveis"""
     print("\n🎮 COMO JOGAR:")
     print("=" * 40)
     print("🌐 Interface Web Moderna:")
-    print("   • Acesse: http://localhost:8000/web_interface.html")
+    print(f"   • Acesse: {SERVER_URL}/web_interface.html")
     print("   • Use os botões para controlar os carros")
     print("   • Visualize a pista em tempo real")
     print("   • Configure parâmetros do jogo")
@@ -131,9 +162,9 @@ def show_controls():
     print("   • Comandos: g (GO), a/2/d/f (carros), s (status)")
     print()
     print("📡 API REST disponível:")
-    print("   • Status: http://localhost:8000/api/status")
-    print("   • Portas: http://localhost:8000/api/ports")
-    print("   • Comandos: http://localhost:8000/api/command")
+    print(f"   • Status: {SERVER_URL}/api/status")
+    print(f"   • Portas: {SERVER_URL}/api/ports")
+    print(f"   • Comandos: {SERVER_URL}/api/command")
     print()
     print("🛑 Para parar o servidor: Ctrl+C")
 
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Snapshot em Memória Compartilhada - Autorama LED Race Game
+O servidor publica o estado ao vivo de cada pista em um bloco de
+multiprocessing.shared_memory ("autorama-<pista>") com layout binário fixo.
+Processos locais (interface Tkinter, painéis de LED, placar) leem um
+snapshot consistente em microssegundos, sem HTTP nem JSON.
+
+Layout (little-endian):
+    cabeçalho  b'ALSS', versão (B), carros (B), status (B: 0 parada,
+               1 em andamento, 2 encerrada), vencedor (B, 0 = nenhum),
+               sequência (Q), publicado em (d, epoch), pid do servidor
+               dono (I), 4 bytes livres
+    carro      posição (d), velocidade (d), última atualização (d, epoch),
+               voltas (H), bateria (h, -1 = desconhecida), 4 bytes livres
+
+A sequência funciona como seqlock: o escritor a deixa ímpar durante a
+escrita e par ao terminar. O leitor copia o bloco inteiro e só aceita a cópia
+se a sequência era par e não mudou; senão tenta de novo. Leitores nunca
+travam nem atrasam o servidor.
+
+Um bloco já existente (servidor encerrado sem limpar) só é reaproveitado se
+o cabeçalho e o tamanho conferem e o processo dono não está mais rodando;
+o bloco de outro servidor vivo nunca é removido.
+
+Uso: python state_snapshot.py [--track 1] [--hz 5]
+"""
+
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple, Optional, Tuple
+
+SNAPSHOT_MAGIC = b'ALSS'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_PREFIX = 'autorama-'
+READ_SPINS = 100  # Tentativas seguidas antes de ceder a CPU ao escritor
+READ_PAUSE = 50e-6  # Pausa após READ_SPINS tentativas: o escritor pode ter perdido a CPU (s)
+READ_TIMEOUT = 0.5  # Espera máxima por um escritor parado no meio de uma escrita (s)
+
+STATUS_CODES = {'stopped': 0, 'running': 1, 'finished': 2}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+_HEADER = struct.Struct('<4sBBBBQdI4x')
+_STATE = struct.Struct('<BB')  # status e vencedor
+_STATE_OFFSET = 6
+_SEQ = struct.Struct('<Q')
+_SEQ_OFFSET = 8
+_PUBLISHED = struct.Struct('<d')
+_PUBLISHED_OFFSET = 16
+_OWNER = struct.Struct('<I')
+_OWNER_OFFSET = 24
+_CAR = struct.Struct('<dddHh4x')
+
+
+def block_name(track):
+    """Nome do bloco de memória compartilhada de uma pista"""
+    return f"{SNAPSHOT_PREFIX}{track}"
+
+
+def block_size(num_cars):
+    return _HEADER.size + num_cars * _CAR.size
+
+
+def _attach(name):
+    """Abre um bloco existente sem registrá-lo no resource_tracker
+
+    Registrado, o bloco seria removido quando o processo terminasse (Python
+    < 3.13), apagando o snapshot do servidor dono.
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _process_alive(pid):
+    """Se o processo pid ainda existe"""
+    if os.name == 'nt':
+        # No Windows o bloco some com o último processo que o mantém aberto:
+        # se ele existe, o dono está vivo (e os.kill(pid, 0) enviaria CTRL_C)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, mas é de outro usuário
+    return True
+
+
+class CarSnapshot(NamedTuple):
+    car: int
+    position: float
+    speed: float
+    laps: int
+    battery: Optional[int]  # None = desconhecida
+    last_update: float  # time.time() da última telemetria; 0 = nunca
+
+
+class Snapshot(NamedTuple):
+    seq: int  # Cresce a cada publicação (par)
+    published_at: float
+    status: str
+    winner: Optional[int]
+    cars: Tuple[CarSnapshot, ...]
+
+
+class SnapshotWriter:
+    """Lado do servidor: cria o bloco da pista e publica o estado
+
+    Threads do mesmo servidor se revezam em um lock próprio do escritor; os
+    leitores, em outros processos, nunca o tocam.
+    """
+
+    def __init__(self, track, num_cars):
+        self.name = block_name(track)
+        self.num_cars = num_cars
+        size = block_size(num_cars)
+        seq = 0
+        try:
+            self._shm = shared_memory.SharedMemory(self.name, create=True, size=size)
+        except FileExistsError:
+            self._shm = _attach(self.name)
+            try:
+                seq = self._adopt(size)
+            except Exception:
+                self._shm.close()
+                raise
+            if getattr(self._shm, '_track', True):
+                # Agora o bloco é deste servidor: removido mesmo se ele cair (Python < 3.13)
+                resource_tracker.register(self._shm._name, 'shared_memory')
+        self._buf = self._shm.buf
+        self._body = bytearray(num_cars * _CAR.size)  # Carros montados fora da janela de escrita
+        self._seq = seq
+        self._lock = threading.Lock()
+        _HEADER.pack_into(self._buf, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, num_cars,
+                          0, 0, seq, 0.0, os.getpid())
+
+    def _adopt(self, size):
+        """Valida um bloco existente antes de reaproveitá-lo; retorna a sequência a seguir
+
+        Sobra de um servidor encerrado sem limpar é reaproveitada no lugar
+        (leitores abertos continuam vendo as publicações). Layout diferente ou
+        dono vivo é erro: remover o bloco apagaria o snapshot do outro servidor.
+        """
+        buf = self._shm.buf
+        if self._shm.size < size:
+            raise FileExistsError(f"Bloco {self.name} já existe com {self._shm.size} bytes "
+                                  f"(esperado {size}); remova-o se nenhum servidor o usa")
+        magic, version, num_cars, _, _, seq, _, owner = _HEADER.unpack_from(buf, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or num_cars != self.num_cars:
+            raise FileExistsError(f"Bloco {self.name} já existe com outro layout "
+                                  f"(versão {version}, {num_cars} carros); remova-o se nenhum servidor o usa")
+        if owner and owner != os.getpid() and _process_alive(owner):
+            raise FileExistsError(f"Bloco {self.name} pertence ao servidor em execução (pid {owner})")
+        return seq + (seq & 1)  # Escritor morto no meio de uma escrita deixa a sequência ímpar
+
+    def write(self, cars, status, winner, now=None):
+        """Publica o CarStateTable e o status do jogo como um novo snapshot"""
+        body = self._body
+        position, speed, laps = cars.position, cars.speed, cars.laps
+        battery, last_update = cars.battery, cars.last_update
+        for index in range(self.num_cars):
+            _CAR.pack_into(body, index * _CAR.size, position[index], speed[index],
+                           last_update[index], laps[index], battery[index])
+        status_code = STATUS_CODES.get(status, 0)
+        now = time.time() if now is None else now
+
+        buf = self._buf
+        with self._lock:
+            seq = self._seq
+            _SEQ.pack_into(buf, _SEQ_OFFSET, seq + 1)  # Ímpar: escrita em andamento
+            _STATE.pack_into(buf, _STATE_OFFSET, status_code, winner or 0)
+            _PUBLISHED.pack_into(buf, _PUBLISHED_OFFSET, now)
+            buf[_HEADER.size:_HEADER.size + len(body)] = body  # O bloco pode ser maior (página)
+            _SEQ.pack_into(buf, _SEQ_OFFSET, seq + 2)
+            self._seq = seq + 2
+
+    def close(self):
+        """Remove o bloco; leitores abertos continuam com a última cópia mapeada"""
+        self._buf = None
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotReader:
+    """Lado dos consumidores: lê snapshots consistentes sem travar o servidor"""
+
+    def __init__(self, track='1'):
+        self.name = block_name(track)
+        self._shm = _attach(self.name)
+        self._buf = self._shm.buf
+        magic, version, num_cars, _, _, _, _, _ = _HEADER.unpack_from(self._buf, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"Bloco {self.name} não é um snapshot do autorama (versão {version})")
+        self.num_cars = num_cars
+        self.size = block_size(num_cars)
+        self.retries = 0  # Leituras repetidas por colidirem com uma escrita
+
+    @property
+    def seq(self):
+        """Sequência atual (ímpar durante uma escrita); barato para detectar mudanças"""
+        return _SEQ.unpack_from(self._buf, _SEQ_OFFSET)[0]
+
+    def read(self, since=None):
+        """Snapshot consistente; None se a sequência ainda é since (nada mudou)"""
+        buf = self._buf
+        size = self.size
+        attempts = 0
+        deadline = None
+        while True:
+            seq = _SEQ.unpack_from(buf, _SEQ_OFFSET)[0]
+            if not seq & 1:
+                if seq == since:
+                    return None
+                data = bytes(buf[:size])  # Uma cópia do bloco inteiro
+                if _SEQ.unpack_from(buf, _SEQ_OFFSET)[0] == seq:
+                    return self._parse(data, seq)
+            self.retries += 1
+            attempts += 1
+            if attempts % READ_SPINS == 0:
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + READ_TIMEOUT
+                elif now > deadline:
+                    raise TimeoutError(f"Snapshot {self.name} em escrita há mais de {READ_TIMEOUT} s")
+                time.sleep(READ_PAUSE)
+
+    def _parse(self, data, seq):
+        _, _, _, status, winner, _, published_at, _ = _HEADER.unpack_from(data, 0)
+        cars = tuple(
+            CarSnapshot(car, position, speed, laps, battery if battery >= 0 else None, updated)
+            for car, (position, speed, updated, laps, battery) in enumerate(
+                _CAR.iter_unpack(data[_HEADER.size:]), 1)
+        )
+        return Snapshot(seq, published_at, STATUS_NAMES.get(status, 'stopped'), winner or None, cars)
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Placar no terminal a partir do snapshot compartilhado")
+    parser.add_argument('--track', default='1', help='id da pista')
+    parser.add_argument('--hz', type=float, default=5.0, help='atualizações por segundo')
+    args = parser.parse_args()
+
+    try:
+        reader = SnapshotReader(args.track)
+    except FileNotFoundError:
+        print(f"❌ Nenhum snapshot da pista {args.track}: o servidor está rodando?")
+        return 1
+
+    seq = None
+    try:
+        while True:
+            snapshot = reader.read(since=seq)
+            if snapshot is not None:
+                seq = snapshot.seq
+                ranking = sorted(snapshot.cars, key=lambda car: (-car.laps, -car.position))
+                line = '  '.join(f"🏎️{car.car}: {car.laps}v {car.position:5.1f} {car.speed:4.1f}"
+                                 for car in ranking)
+                winner = f" 🏆 {snapshot.winner}" if snapshot.winner else ''
+                print(f"[{snapshot.status:<8}]{winner} {line}")
+            time.sleep(1 / args.hz)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Histórico de Telemetria - Autorama LED Race Game
+Buffer circular de amostras por carro (instante, posição, velocidade, voltas e
+bateria) guardado em arrays de tamanho fixo, reservados na primeira amostra de
+cada carro: pistas criadas por uma conexão que falhou (e carros que nunca
+correm) não ocupam memória. As amostras mais antigas são sobrescritas quando o
+buffer enche.
+
+As amostras são tiradas da CarStateTable no máximo a cada HISTORY_INTERVAL
+segundos por carro; com os valores padrão o buffer cobre um dia de evento de
+12 horas. Instantes são segundos desde a época (time.time()).
+"""
+
+import threading
+from array import array
+
+HISTORY_INTERVAL = 0.2  # Intervalo mínimo entre amostras de um carro (s)
+HISTORY_SECONDS = 12 * 3600  # Janela coberta pelo buffer com o intervalo padrão (s)
+MAX_HISTORY_POINTS = 5000  # Pontos por carro em uma consulta antes da redução
+
+
+class CarHistory:
+    """Buffer circular das amostras de um carro"""
+
+    __slots__ = ('capacity', 'time', 'position', 'speed', 'laps', 'battery', 'head', 'count')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.time = None  # Arrays reservados na primeira amostra (ver _allocate)
+        self.position = None
+        self.speed = None
+        self.laps = None
+        self.battery = None
+        self.head = 0  # Próxima posição de escrita
+        self.count = 0
+
+    def _allocate(self):
+        capacity = self.capacity
+        self.time = array('d', [0.0]) * capacity
+        self.position = array('f', [0.0]) * capacity
+        self.speed = array('f', [0.0]) * capacity
+        self.laps = array('H', [0]) * capacity
+        self.battery = array('h', [-1]) * capacity
+
+    def append(self, timestamp, position, speed, laps, battery):
+        """Grava uma amostra, sobrescrevendo a mais antiga se estiver cheio"""
+        if self.time is None:
+            self._allocate()
+        index = self.head
+        self.time[index] = timestamp
+        self.position[index] = position
+        self.speed[index] = speed
+        self.laps[index] = laps
+        self.battery[index] = battery
+        self.head = (index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _slot(self, offset):
+        """Posição física da offset-ésima amostra mais antiga"""
+        return (self.head - self.count + offset) % self.capacity
+
+    def _bisect(self, timestamp, low=0, high=None, right=False):
+        """Primeira amostra (em ordem cronológica) com instante >= timestamp
+        
+        Com right=True, a primeira com instante > timestamp.
+        """
+        if high is None:
+            high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            value = self.time[self._slot(middle)]
+            if value < timestamp or (right and value == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def query(self, since=None, until=None, step=None):
+        """Amostras em [since, until] em colunas, no máximo uma a cada step segundos"""
+        first = 0 if since is None else self._bisect(since)
+        last = self.count if until is None else self._bisect(until, right=True)
+        columns = {'time': [], 'position': [], 'speed': [], 'laps': [], 'battery': []}
+        if first >= last:
+            return columns, 0.0
+
+        span = self.time[self._slot(last - 1)] - self.time[self._slot(first)]
+        step = max(step or 0.0, span / MAX_HISTORY_POINTS)
+        times, positions, speeds = columns['time'], columns['position'], columns['speed']
+        laps, batteries = columns['laps'], columns['battery']
+        offset = first
+        while offset < last:
+            index = self._slot(offset)
+            timestamp = self.time[index]
+            times.append(timestamp)
+            positions.append(round(self.position[index], 2))
+            speeds.append(round(self.speed[index], 2))
+            laps.append(self.laps[index])
+            battery = self.battery[index]
+            batteries.append(battery if battery >= 0 else None)
+            # Pular direto para a primeira amostra do próximo intervalo
+            offset = self._bisect(timestamp + step, offset + 1, last) if step else offset + 1
+        return columns, step
+
+
+class TelemetryHistory:
+    """Histórico de todos os carros de uma CarStateTable"""
+
+    def __init__(self, num_cars, interval=HISTORY_INTERVAL, seconds=HISTORY_SECONDS):
+        self.interval = interval
+        self.capacity = max(1, int(seconds / interval))
+        self._cars = [CarHistory(self.capacity) for _ in range(num_cars)]
+        self._last_sample = array('d', [0.0]) * num_cars
+        self._lock = threading.Lock()
+
+    def record(self, table, now):
+        """Amostra os carros atualizados desde a última amostra (intervalo mínimo respeitado)"""
+        with self._lock:
+            for index, history in enumerate(self._cars):
+                updated = table.last_update[index]
+                last = self._last_sample[index]
+                if updated <= last or now - last < self.interval:
+                    continue
+                history.append(now, table.position[index], table.speed[index],
+                               table.laps[index], table.battery[index])
+                self._last_sample[index] = now
+
+    def query(self, car=None, since=None, until=None, step=None):
+        """Histórico de um carro (1-based) ou de todos: {carro: {colunas, step}}"""
+        cars = range(1, len(self._cars) + 1) if car is None else (car,)
+        result = {}
+        with self._lock:
+            for number in cars:
+                columns, effective_step = self._cars[number - 1].query(since, until, step)
+                result[number] = dict(columns, step=effective_step)
+        return result
+
+    def stats(self):
+        """Ocupação do buffer: amostras guardadas e capacidade por carro"""
+        with self._lock:
+            return {
+                'capacity_per_car': self.capacity,
+                'samples': {number: history.count for number, history in enumerate(self._cars, 1)},
+                'interval': self.interval,
+            }
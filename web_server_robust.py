@@ -4,76 +4,164 @@
 Servidor Flask para controle remoto via interface web moderna
 """
 
+import functools
 import os
+import re
+import secrets
 import sys
 import time
 import json
 import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template_string, send_from_directory
+from flask import Flask, Response, g, request, jsonify, render_template_string, send_from_directory
 from flask_cors import CORS
 import serial
-import serial.tools.list_ports
-
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('autorama_server.log'),
-        logging.StreamHandler()
-    ]
+
+from autorama_protocol import (
+    ECHO_PREFIX, SETUP_DONE, CarStatus, LapCompleted, LegacyTelemetry, LineParser, RaceFinished,
+    RaceReset, RaceStarted, SpeedChanged, StreamDecoder, TelemetryFrame, Winner
 )
+from game_state import CarStateTable, configured_num_cars
+from lap_timing import LapTimer
+from log_pipeline import pipeline_stats, setup_logging
+from metrics import REGISTRY
+from race_recorder import REPLAY_PREFIX, RaceRecorder, ReplaySerial
+from serial_broker import BROKER_PREFIX, BrokerSerial
+from serial_ports import Backoff, PortCache
+from state_snapshot import SnapshotWriter
+from telemetry_history import TelemetryHistory
+
+try:
+    from flask_sock import Sock
+except ImportError:  # WebSocket é opcional: sem flask-sock os jogadores usam /api/command
+    Sock = None
+
+# Configuração de logging (fila + thread de escrita, arquivo rotacionado)
+LOG_FILE = 'autorama_server.log'
+log_listener = setup_logging(LOG_FILE)
 logger = logging.getLogger(__name__)
 
 # Configuração da aplicação Flask
 app = Flask(__name__)
 CORS(app)  # Permitir CORS para desenvolvimento
+sock = Sock(app) if Sock else None
 
 # Configurações globais
-SERIAL_PORT = None
-SERIAL_CONNECTION = None
-CONNECTION_STATUS = False
-LAST_TELEMETRY = {}
-GAME_STATE = {
-    'status': 'stopped',
-    'start_time': None,
-    'cars': {
-        1: {'position': 0, 'speed': 0.0, 'laps': 0, 'last_update': None},
-        2: {'position': 0, 'speed': 0.0, 'laps': 0, 'last_update': None},
-        3: {'position': 0, 'speed': 0.0, 'laps': 0, 'last_update': None},
-        4: {'position': 0, 'speed': 0.0, 'laps': 0, 'last_update': None}
-    }
-}
+SERVER_PORT = int(os.environ.get('AUTORAMA_PORT', 8000))
 
-# Configurações de velocidade
+# Pistas: cada uma com a sua ESP32 (ver Track); as rotas /api/... sem id usam a padrão
+DEFAULT_TRACK = '1'
+MAX_TRACKS = 16
+TRACK_ID = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+# Configurações de velocidade (valores iniciais de cada pista)
 SPEED_CONFIG = {
     'acceleration_rate': 0.2,
     'max_speed': 5.0,
     'initial_speed': 0.5
 }
 
+# Configurações da comunicação serial
+COMMAND_TIMEOUT = 1.0  # Tempo máximo aguardando o eco de um comando (s)
+READ_TIMEOUT = 0.1  # Timeout de leitura da porta e da fila de linhas (s)
+BOOT_TIMEOUT = 6.0  # Espera máxima pelo fim do setup() da ESP32 ao conectar (s)
+INBOX_BATCHES = 256  # Lotes de linhas/quadros aguardando processamento
+# Sem nenhum byte por este tempo o enlace é considerado morto (s). Precisa
+# passar do maior bloqueio do firmware sem saída serial: showVictory() pisca
+# 10 × (delay(200) + delay(200)) = 4 s e testMode() dá delay(1000) por cor.
+# Reabrir a porta à toa pulsa DTR/RTS e pode resetar a placa.
+LINK_SILENCE = 6.0
+
+# Comando de aceleração de cada carro no firmware
+CAR_COMMANDS = {1: 'a', 2: '2', 3: 'd', 4: 'f'}
+PRESS_BYTES = b'a2dfADF'  # Caracteres de aceleração (o firmware aceita maiúsculas)
+
+# Agrupamento de escritas: pressões que chegam dentro da janela viram um write
+COALESCE_WINDOW = 0.003  # Janela de agrupamento (s); 0 desativa
+COALESCE_MAX_BYTES = 64  # Tamanho máximo de um write agrupado
+MAX_BATCH_COMMANDS = 64  # Comandos aceitos por requisição em /api/commands
+
+# Configurações do stream de telemetria (Server-Sent Events)
+STREAM_MIN_INTERVAL = 0.05  # Intervalo mínimo entre publicações (s)
+STREAM_HEARTBEAT = 15.0  # Comentário enviado a clientes ociosos (s)
+LONG_POLL_TIMEOUT = 25.0  # Espera máxima de ?since=<versão> antes do 304 (s)
+
+# Gravação do tráfego serial (ver race_recorder.py)
+CAPTURE_DIR = 'captures'  # Pasta padrão das capturas
+
+# Métricas exportadas em /metrics (ver metrics.py)
+RTT_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+SERIAL_RTT = REGISTRY.histogram(
+    'autorama_serial_rtt_seconds', 'Tempo entre a escrita de um comando e o seu eco',
+    ('track',), buckets=RTT_BUCKETS)
+SERIAL_COMMANDS = REGISTRY.counter(
+    'autorama_serial_commands_total', 'Comandos enviados por resultado', ('track', 'result'))
+SERIAL_BYTES = REGISTRY.counter(
+    'autorama_serial_bytes_total', 'Bytes trafegados na serial por direção', ('track', 'direction'))
+SERIAL_DROPPED_BYTES = REGISTRY.counter(
+    'autorama_serial_dropped_bytes_total', 'Bytes descartados pelo decodificador (quadros corrompidos)',
+    ('track',))
+SERIAL_CONNECTS = REGISTRY.counter(
+    'autorama_serial_connects_total', 'Tentativas de conexão por resultado', ('track', 'result'))
+SERIAL_LINK_LOST = REGISTRY.counter(
+    'autorama_serial_link_lost_total', 'Conexões perdidas por motivo (error = falha de I/O, silence = sem dados)',
+    ('track', 'reason'))
+TELEMETRY_EVENTS = REGISTRY.counter(
+    'autorama_telemetry_events_total', 'Linhas e quadros processados por tipo de evento (LogLine = não reconhecida)',
+    ('track', 'event'))
+TELEMETRY_ERRORS = REGISTRY.counter(
+    'autorama_telemetry_errors_total', 'Eventos que falharam ao ser aplicados ao estado', ('track',))
+TELEMETRY_DROPPED = REGISTRY.counter(
+    'autorama_telemetry_dropped_records_total', 'Linhas e quadros descartados por atraso do processamento',
+    ('track',))
+TELEMETRY_BATCH = REGISTRY.histogram(
+    'autorama_telemetry_batch_seconds', 'Tempo de processamento de um lote de telemetria', ('track',),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1))
+HTTP_LATENCY = REGISTRY.histogram(
+    'autorama_http_request_duration_seconds', 'Latência das rotas HTTP', ('method', 'route'))
+
 class SerialManager:
-    """Gerenciador de conexão serial com ESP32"""
+    """Gerenciador de conexão serial com ESP32
+
+    A porta pertence a duas threads: uma leitora, que consome todas as linhas
+    recebidas, e uma escritora, que esvazia a fila de comandos. Cada caractere
+    enviado recebe um Future resolvido quando o eco "📡 Comando: x" do firmware
+    chega, de modo que nenhuma rota HTTP lê a porta diretamente.
     
-    def __init__(self):
+    Uma terceira thread, a supervisora, reabre a porta quando o enlace cai
+    (erro de I/O ou LINK_SILENCE segundos sem dados), procurando a mesma placa
+    pelo hwid e esperando cada vez mais entre as tentativas. Enquanto isso os
+    comandos falham na hora, como sem conexão, e nenhuma requisição espera.
+    """
+    
+    def __init__(self, track=DEFAULT_TRACK):
+        self.track = track  # Id da pista (labels das métricas e nomes das threads)
         self.port = None
+        self.hwid = None  # Identificação USB da placa (None: reconecta pelo nome da porta)
         self.connection = None
         self.connected = False
+        self.reconnecting = False
+        self._stop = threading.Event()
+        self._ready = threading.Event()  # A placa deu sinal de vida na conexão atual
+        self._closed = threading.Event()  # Desconexão pedida: a supervisora encerra
+        self._link_lost = threading.Event()
+        self._supervisor_thread = None
+        self._outbox = queue.Queue()
+        self._inbox = queue.Queue(maxsize=INBOX_BATCHES)  # Lotes de linhas e quadros
+        self._pending = deque()  # (caractere, Future, prazo) na ordem de envio
+        self._pending_lock = threading.Lock()
+        self._reader_thread = None
+        self._writer_thread = None
+        self.recorder = None  # RaceRecorder ativo, se houver
         
-    def list_ports(self):
-        """Lista todas as portas seriais disponíveis"""
+    def list_ports(self, refresh=False):
+        """Lista todas as portas seriais disponíveis (em cache até /dev mudar)"""
         try:
-            ports = list(serial.tools.list_ports.comports())
-            port_info = []
-            for port in ports:
-                port_info.append({
-                    'device': port.device,
-                    'description': port.description,
-                    'manufacturer': port.manufacturer,
-                    'hwid': port.hwid
-                })
-            return port_info
+            return port_cache.ports(refresh)
         except Exception as e:
             logger.error(f"Erro ao listar portas: {e}")
             return []
@@ -85,29 +173,30 @@ class SerialManager:
                 self.disconnect()
             
             logger.info(f"Conectando à porta {port_name}...")
-            self.connection = serial.Serial(
-                port=port_name,
-                baudrate=115200,
-                timeout=1,
-                write_timeout=1
-            )
-            
-            # Aguardar inicialização
-            time.sleep(2)
+            replay = port_name.startswith(REPLAY_PREFIX)
+            self.connection = self._open(port_name)
             
             if self.connection.is_open:
                 self.port = port_name
                 self.connected = True
+                self._start_io()
+                if not replay:
+                    # Captura gravada não cai; uma placa real é supervisionada
+                    self.hwid = port_cache.hwid(port_name)
+                    self._start_supervisor()
+                SERIAL_CONNECTS.inc(1, self.track, 'ok')
                 logger.info(f"Conectado com sucesso à porta {port_name}")
                 
                 # Testar comunicação
-                self.send_command('s')  # Status
+                self._await_board()
                 return True
             else:
+                SERIAL_CONNECTS.inc(1, self.track, 'error')
                 logger.error("Falha ao abrir conexão serial")
                 return False
                 
         except Exception as e:
+            SERIAL_CONNECTS.inc(1, self.track, 'error')
             logger.error(f"Erro ao conectar: {e}")
             self.connected = False
             return False
@@ -115,64 +204,933 @@ class SerialManager:
     def disconnect(self):
         """Desconecta da porta serial"""
         try:
+            self._stop_supervisor()
+            self._stop_io()
             if self.connection and self.connection.is_open:
                 self.connection.close()
             self.connection = None
             self.port = None
+            self.hwid = None
             self.connected = False
+            self.reconnecting = False
             logger.info("Desconectado da porta serial")
             return True
         except Exception as e:
             logger.error(f"Erro ao desconectar: {e}")
             return False
     
-    def send_command(self, command):
-        """Envia comando para o ESP32"""
-        if not self.connected or not self.connection:
-            logger.warning("Não conectado ao ESP32")
-            return None
+    def _open(self, port_name):
+        """Abre a porta (ou a reprodução de uma captura) sem esperar a placa"""
+        if port_name.startswith(REPLAY_PREFIX):
+            # Reprodução de uma captura gravada no lugar da ESP32
+            return ReplaySerial.from_url(port_name, timeout=READ_TIMEOUT)
+        if port_name.startswith(BROKER_PREFIX):
+            # Porta compartilhada por um serial_broker.py local
+            return BrokerSerial.from_url(port_name, timeout=READ_TIMEOUT)
+        return serial.Serial(
+            port=port_name,
+            baudrate=115200,
+            timeout=READ_TIMEOUT,
+            write_timeout=1
+        )
+    
+    def _await_board(self, timeout=BOOT_TIMEOUT):
+        """Espera a placa dar sinal de vida depois de abrir a porta
         
+        Pronta é o eco de um comando, um quadro de telemetria ou o fim do
+        setup() ("✅ Setup concluído!"). Uma placa já iniciada responde à
+        sonda de status em milissegundos; uma que reiniciou ao abrir a porta
+        só depois do setup(), e a sonda perdida no boot é reenviada.
+        """
+        started = time.monotonic()
+        probe = self.submit('s')  # Status
+        if not self._ready.wait(timeout):
+            logger.warning(f"ESP32 sem resposta em {timeout:.0f} s; conexão mantida")
+            return False
         try:
-            # Adicionar quebra de linha se necessário
-            if not command.endswith('\n'):
-                command += '\n'
+            probe.result(timeout=COMMAND_TIMEOUT)
+        except Exception:
+            self.submit('s')
+        logger.info(f"✅ ESP32 pronta em {(time.monotonic() - started) * 1000:.0f} ms")
+        return True
+    
+    def _start_supervisor(self):
+        self._closed = threading.Event()
+        self._link_lost = threading.Event()
+        self._supervisor_thread = threading.Thread(
+            target=self._supervise, args=(self._closed, self._link_lost),
+            name=f'serial-supervisor-{self.track}', daemon=True
+        )
+        self._supervisor_thread.start()
+    
+    def _stop_supervisor(self):
+        self._closed.set()
+        self._link_lost.set()
+        thread, self._supervisor_thread = self._supervisor_thread, None
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=COMMAND_TIMEOUT * 2)
+    
+    def _lose_link(self, reason, error):
+        """Marca o enlace como perdido e acorda a supervisora (threads de I/O)"""
+        SERIAL_LINK_LOST.inc(1, self.track, reason)
+        self.connected = False
+        self._fail_pending(error)
+        self._link_lost.set()
+    
+    def _supervise(self, closed, link_lost):
+        """Thread supervisora: reabre a porta com recuo exponencial quando o enlace cai"""
+        backoff = Backoff()
+        while True:
+            link_lost.wait()
+            if closed.is_set():
+                return
+            self.reconnecting = True
+            self._stop_io()
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            lost_at = time.monotonic()
+            logger.warning(f"🔌 Enlace perdido na pista {self.track}; reconectando a {self.port}...")
+            
+            connection = None
+            attempts = 0
+            while not closed.is_set():
+                attempts += 1
+                # A placa religada pode voltar com outro nome (ttyUSB0 -> ttyUSB1)
+                device = (port_cache.find(self.hwid, refresh=attempts > 1)
+                          if self.hwid else self.port)
+                if device:
+                    try:
+                        connection = self._open(device)
+                        break
+                    except Exception as e:
+                        logger.debug("Reconexão a %s falhou: %s", device, e)
+                SERIAL_CONNECTS.inc(1, self.track, 'retry')
+                closed.wait(backoff.next())
+            
+            if closed.is_set():
+                if connection:
+                    connection.close()
+                return
+            backoff.reset()
+            link_lost.clear()
+            self.connection = connection
+            self.port = device
+            self.connected = True
+            self.reconnecting = False
+            self._start_io()
+            SERIAL_CONNECTS.inc(1, self.track, 'reconnect')
+            logger.info(f"🔌 Pista {self.track} reconectada a {device} em "
+                        f"{time.monotonic() - lost_at:.2f} s ({attempts} tentativa(s))")
+    
+    def start_recording(self, path):
+        """Passa a gravar todo o tráfego serial no arquivo de captura"""
+        self.stop_recording()
+        self.recorder = RaceRecorder(path)
+        logger.info(f"🎬 Gravando tráfego serial em {path}")
+    
+    def stop_recording(self):
+        """Encerra a gravação em andamento; retorna o caminho da captura"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return None
+        recorder.close()
+        logger.info(f"🎬 Gravação encerrada: {recorder.path} ({recorder.records} registros)")
+        return recorder.path
+    
+    def _start_io(self):
+        """Inicia as threads leitora e escritora da conexão atual"""
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._outbox = queue.Queue()
+        self._reader_thread = threading.Thread(
+            target=self._reader_loop, args=(self.connection, self._stop, self._ready),
+            name=f'serial-reader-{self.track}', daemon=True
+        )
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, args=(self.connection, self._stop, self._outbox),
+            name=f'serial-writer-{self.track}', daemon=True
+        )
+        self._reader_thread.start()
+        self._writer_thread.start()
+    
+    def _stop_io(self):
+        """Para as threads de I/O e cancela comandos pendentes"""
+        self._stop.set()
+        self._outbox.put(None)
+        for thread in (self._reader_thread, self._writer_thread):
+            if thread and thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=READ_TIMEOUT * 5)
+        self._reader_thread = None
+        self._writer_thread = None
+        self._fail_pending(ConnectionError("Conexão serial encerrada"))
+    
+    def _fail_pending(self, error):
+        """Resolve com erro todos os comandos que aguardam eco"""
+        with self._pending_lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        if pending:
+            SERIAL_COMMANDS.inc(len(pending), self.track, 'error')
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(error)
+    
+    def _expire_pending(self):
+        """Expira comandos cujo eco não chegou dentro de COMMAND_TIMEOUT"""
+        now = time.monotonic()
+        expired = []
+        with self._pending_lock:
+            # Prazos crescem na ordem de envio: basta olhar o início da fila
+            while self._pending and self._pending[0][2] <= now:
+                expired.append(self._pending.popleft())
+        if expired:
+            SERIAL_COMMANDS.inc(len(expired), self.track, 'timeout')
+        for char, future, _ in expired:
+            if not future.done():
+                future.set_exception(TimeoutError(f"Sem eco para o comando '{char}'"))
+    
+    def _reader_loop(self, connection, stop, ready):
+        """Thread leitora: única dona das leituras da porta"""
+        decoder = StreamDecoder()
+        # O firmware envia quadros mesmo com a corrida parada; o silêncio só
+        # conta depois do primeiro quadro (firmwares antigos ficam mudos)
+        heard_frames = False
+        supervised = not (self.port or '').startswith(REPLAY_PREFIX)
+        last_rx = time.monotonic()
+        while not stop.is_set():
+            try:
+                # Bloqueia até chegar ao menos um byte e leva tudo o que houver
+                raw = connection.read(max(1, connection.in_waiting))
+            except Exception as e:
+                if not stop.is_set():
+                    logger.error(f"Erro ao ler telemetria: {e}")
+                    self._lose_link('error', e)
+                return
             
-            logger.info(f"Enviando comando: {command.strip()}")
-            self.connection.write(command.encode('utf-8'))
+            if self._pending:
+                self._expire_pending()
             
-            # Aguardar resposta
-            time.sleep(0.1)
+            if not raw:
+                if supervised and heard_frames and time.monotonic() - last_rx > LINK_SILENCE and not stop.is_set():
+                    logger.error(f"Sem dados da ESP32 há mais de {LINK_SILENCE:.0f} s")
+                    self._lose_link('silence', ConnectionError("Enlace serial mudo"))
+                    return
+                continue
+            last_rx = time.monotonic()
+            SERIAL_BYTES.inc(len(raw), self.track, 'in')
+            if self.recorder:
+                self._record_traffic('record_rx', raw)
+            dropped = decoder.dropped_bytes
+            lines, frames = decoder.feed(raw)
+            if decoder.dropped_bytes != dropped:
+                SERIAL_DROPPED_BYTES.inc(decoder.dropped_bytes - dropped, self.track)
             
-            if self.connection.in_waiting:
-                response = self.connection.readline().decode('utf-8').strip()
-                logger.info(f"Resposta recebida: {response}")
-                return response
+            for line in lines:
+                if line.startswith(ECHO_PREFIX):
+                    self._resolve_echo(line[len(ECHO_PREFIX):], line)
+                    ready.set()
+                elif line == SETUP_DONE:
+                    ready.set()
+            if frames:
+                heard_frames = True
+                ready.set()
+            if lines or frames:
+                self._deliver(lines + frames if frames else lines)
+    
+    def _deliver(self, batch):
+        """Entrega um lote de linhas e quadros ao processamento de telemetria"""
+        try:
+            self._inbox.put_nowait(batch)
+        except queue.Full:
+            # Consumidor atrasado: descartar o lote mais antigo
+            try:
+                TELEMETRY_DROPPED.inc(len(self._inbox.get_nowait()), self.track)
+            except queue.Empty:
+                pass
+            self._inbox.put_nowait(batch)
+    
+    def _writer_loop(self, connection, stop, outbox):
+        """Thread escritora: única dona das escritas da porta"""
+        carry = None
+        while not stop.is_set():
+            if carry is not None:
+                item, carry = carry, None
             else:
-                logger.info("Comando enviado, sem resposta")
-                return "OK"
-                
+                item = outbox.get()
+            if item is None:
+                return
+            payload, futures = item
+            
+            if COALESCE_WINDOW and not payload.strip(PRESS_BYTES):
+                payload, futures, carry = self._coalesce(outbox, payload, futures)
+            
+            self._write(connection, payload, futures)
+    
+    def _coalesce(self, outbox, payload, futures):
+        """Agrupa pressões de aceleração que chegam dentro de COALESCE_WINDOW
+        
+        A ordem é preservada: o primeiro item que não é uma pressão encerra o
+        grupo e é devolvido para ser escrito logo em seguida.
+        """
+        chunks = [payload]
+        futures = list(futures)
+        size = len(payload)
+        deadline = time.monotonic() + COALESCE_WINDOW
+        while size < COALESCE_MAX_BYTES:
+            try:
+                remaining = deadline - time.monotonic()
+                item = outbox.get(timeout=remaining) if remaining > 0 else outbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is None or item[0].strip(PRESS_BYTES):
+                return b''.join(chunks), futures, item
+            chunks.append(item[0])
+            futures.extend(item[1])
+            size += len(item[0])
+        return b''.join(chunks), futures, None
+    
+    def _write(self, connection, payload, futures):
+        """Escreve um bloco de comandos registrando os ecos esperados"""
+        # Registrar antes de escrever para que o eco nunca chegue primeiro
+        deadline = time.monotonic() + COMMAND_TIMEOUT
+        entries = [(char, future, deadline) for char, future in futures]
+        with self._pending_lock:
+            self._pending.extend(entries)
+        
+        try:
+            connection.write(payload)
         except Exception as e:
             logger.error(f"Erro ao enviar comando: {e}")
-            return None
+            with self._pending_lock:
+                for entry in entries:
+                    try:
+                        self._pending.remove(entry)
+                    except ValueError:
+                        pass
+            SERIAL_COMMANDS.inc(len(entries), self.track, 'error')
+            for _, future, _ in entries:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        SERIAL_BYTES.inc(len(payload), self.track, 'out')
+        if self.recorder:
+            self._record_traffic('record_tx', payload)
+    
+    def _record_traffic(self, method, data):
+        """Grava na captura ativa; uma falha encerra a gravação, nunca o I/O serial"""
+        recorder = self.recorder
+        if recorder is None:
+            return
+        try:
+            getattr(recorder, method)(data)
+        except Exception as e:
+            logger.error(f"❌ Erro gravando {recorder.path}: {e}; gravação encerrada")
+            if self.recorder is recorder:
+                self.recorder = None
+            try:
+                recorder.close()
+            except Exception:
+                pass
+    
+    def _resolve_echo(self, char, line):
+        """Resolve o comando pendente correspondente ao eco recebido
+        
+        O firmware processa os caracteres em ordem, então entradas mais antigas
+        que a correspondente perderam o eco e são resolvidas sem resposta.
+        """
+        with self._pending_lock:
+            for index, (expected, _, _) in enumerate(self._pending):
+                if expected == char:
+                    break
+            else:
+                return  # Eco de um comando que não partiu deste servidor
+            
+            resolved = [self._pending.popleft() for _ in range(index + 1)]
+        
+        # O prazo é o instante da escrita + COMMAND_TIMEOUT
+        SERIAL_RTT.observe(time.monotonic() - resolved[-1][2] + COMMAND_TIMEOUT, self.track)
+        SERIAL_COMMANDS.inc(1, self.track, 'echo')
+        if len(resolved) > 1:
+            SERIAL_COMMANDS.inc(len(resolved) - 1, self.track, 'no_echo')
+        for _, future, _ in resolved[:-1]:
+            if not future.done():
+                future.set_result(None)
+        future = resolved[-1][1]
+        if not future.done():
+            future.set_result(line)
+    
+    def submit(self, command):
+        """Enfileira um comando sem bloquear
+        
+        Retorna um Future resolvido com a linha de eco do último caractere do
+        comando, ou None se não houver conexão.
+        """
+        futures = self.submit_many([command])
+        return futures[0] if futures else None
     
-    def read_telemetry(self):
-        """Lê telemetria do ESP32"""
+    def submit_many(self, commands):
+        """Enfileira uma lista ordenada de comandos em um único write
+        
+        Retorna um Future por comando (None para comandos vazios), ou None se
+        não houver conexão.
+        """
         if not self.connected or not self.connection:
+            logger.warning("Não conectado ao ESP32")
             return None
         
+        payload = []
+        char_futures = []
+        results = []
+        for command in commands:
+            # O firmware lê um caractere por vez; quebras de linha são descartadas
+            chars = command.strip()
+            if not chars:
+                results.append(None)
+                continue
+            futures = [(char, Future()) for char in chars]
+            payload.append(chars)
+            char_futures.extend(futures)
+            results.append(futures[-1][1])
+        
+        if char_futures:
+            self._outbox.put((''.join(payload).encode('utf-8'), char_futures))
+        return results
+    
+    def wait_response(self, future, timeout=COMMAND_TIMEOUT):
+        """Aguarda o eco de um comando enfileirado
+        
+        Retorna a linha de eco, "OK" se o comando foi enviado sem resposta ou
+        None em caso de erro de comunicação.
+        """
         try:
-            if self.connection.in_waiting:
-                data = self.connection.readline().decode('utf-8').strip()
-                if data:
-                    logger.debug(f"Telemetria recebida: {data}")
-                    return data
-            return None
+            response = future.result(timeout=timeout)
+        except (FutureTimeoutError, TimeoutError):
+            logger.info("Comando enviado, sem resposta")
+            return "OK"
         except Exception as e:
-            logger.error(f"Erro ao ler telemetria: {e}")
+            logger.error(f"Erro ao enviar comando: {e}")
             return None
+        
+        if response is None:
+            logger.info("Comando enviado, sem resposta")
+            return "OK"
+        logger.info("Resposta recebida: %s", response)
+        return response
+    
+    def send_command(self, command, timeout=COMMAND_TIMEOUT):
+        """Envia comando para o ESP32 e aguarda o eco correspondente"""
+        logger.info("Enviando comando: %s", command.strip())
+        future = self.submit(command)
+        if future is None:
+            return None
+        return self.wait_response(future, timeout)
+    
+    def read_telemetry(self, timeout=READ_TIMEOUT):
+        """Lê o próximo lote de linhas e quadros do ESP32 (bloqueia até timeout)
+        
+        Retorna as linhas de texto seguidas dos quadros binários da mesma
+        leitura; lista vazia se nada chegou.
+        """
+        if not self.connected or not self.connection:
+            return []
+        
+        try:
+            batch = self._inbox.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        logger.debug("Telemetria recebida: %d registros", len(batch))
+        return batch
 
-# Instância global do gerenciador serial
-serial_manager = SerialManager()
+class TelemetryBroadcaster:
+    """Distribui o estado do jogo para os clientes do stream SSE
+
+    Cada publicação é serializada uma única vez e os mesmos bytes são entregues
+    a todos os assinantes. Só o quadro mais recente é mantido: um cliente lento
+    pula os quadros intermediários em vez de acumular uma fila.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._version = 0
+        self._frame = None
+        self.subscribers = 0
+    
+    def publish(self, payload):
+        """Serializa o estado e acorda os assinantes"""
+        data = json.dumps(payload, separators=(',', ':'), default=str)
+        with self._condition:
+            self._version += 1
+            self._frame = f"id: {self._version}\ndata: {data}\n\n".encode('utf-8')
+            self._condition.notify_all()
+    
+    def stream(self):
+        """Gerador de quadros SSE para um assinante"""
+        seen = 0
+        with self._condition:
+            self.subscribers += 1
+        try:
+            while True:
+                with self._condition:
+                    changed = self._condition.wait_for(
+                        lambda: self._version != seen, timeout=STREAM_HEARTBEAT
+                    )
+                    if changed:
+                        seen = self._version
+                        frame = self._frame
+                    else:
+                        frame = b': ping\n\n'
+                yield frame
+        finally:
+            with self._condition:
+                self.subscribers -= 1
+
+class StateCache:
+    """Versão monotônica do estado com as respostas JSON em cache
+
+    Toda mudança de estado (telemetria, comandos, conexão, configuração)
+    incrementa a versão. Cada visão (status, telemetria) é serializada uma
+    única vez por versão e os mesmos bytes atendem todos os clientes até a
+    próxima mudança; a versão também serve de ETag e de cursor de long-poll.
+    
+    A versão recomeça em 1 a cada processo, então o cursor público leva um
+    boot id ("<boot>-<versão>"): ETags e ?since= de um servidor anterior
+    nunca coincidem com uma versão nova.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._render_lock = threading.Lock()
+        self._views = {}
+        self.boot = secrets.token_hex(4)
+        self.version = 1
+    
+    def tag(self, version):
+        """Cursor público da versão (ETag, X-State-Version e ?since=)"""
+        return f"{self.boot}-{version}"
+    
+    def parse(self, cursor):
+        """Versão de um cursor deste cache; None se é de outro boot, do futuro ou inválido"""
+        boot, _, version = cursor.rpartition('-')
+        if boot != self.boot or not version.isdigit():
+            return None
+        version = int(version)
+        return version if version <= self.version else None
+    
+    def bump(self):
+        """Marca uma mudança de estado e acorda os clientes em long-poll"""
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+    
+    def wait_newer(self, since, timeout):
+        """Espera uma versão maior que since; retorna a versão atual"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > since, timeout=timeout)
+            return self.version
+    
+    def render(self, name, build):
+        """Retorna (cursor, bytes JSON) da visão, serializando só se mudou"""
+        with self._render_lock:
+            tag = self.tag(self.version)
+            cached = self._views.get(name)
+            if cached is None or cached[0] != tag:
+                cached = self._views[name] = (tag, json.dumps(build(tag), default=str).encode('utf-8'))
+            return cached
+
+class PlayerChannel:
+    """Canal WebSocket persistente de um jogador
+
+    Cada mensagem recebida é uma pressão do acelerador identificada por um
+    número de sequência curto (ex.: "17"). O comando vai direto para a fila do
+    escritor serial e a confirmação "17:ok" é enviada quando o eco do firmware
+    chega ("17:timeout", "17:lost" ou "17:offline" nos demais casos).
+    """
+    
+    def __init__(self, ws, car_num, serial_manager):
+        self.ws = ws
+        self.command = CAR_COMMANDS[car_num]
+        self.serial_manager = serial_manager
+        self._acks = queue.SimpleQueue()
+    
+    def run(self):
+        """Recebe pressões até o cliente fechar o canal"""
+        sender = threading.Thread(target=self._send_acks, name='ws-acks', daemon=True)
+        sender.start()
+        try:
+            while True:
+                seq = self.ws.receive()
+                if seq is None:
+                    break
+                self._press(seq)
+        finally:
+            self._acks.put(None)
+            sender.join(timeout=1)
+    
+    def _press(self, seq):
+        """Envia uma pressão sem bloquear a leitura do canal"""
+        future = self.serial_manager.submit(self.command)
+        if future is None:
+            self._acks.put(f"{seq}:offline")
+            return
+        future.add_done_callback(lambda done: self._acks.put(f"{seq}:{self._ack_status(done)}"))
+    
+    @staticmethod
+    def _ack_status(future):
+        """Traduz o resultado do Future em status de confirmação"""
+        error = future.exception()
+        if isinstance(error, TimeoutError):
+            return 'timeout'
+        if error is not None:
+            return 'offline'
+        return 'ok' if future.result() is not None else 'lost'
+    
+    def _send_acks(self):
+        """Thread que envia as confirmações, fora da thread leitora serial"""
+        while True:
+            ack = self._acks.get()
+            if ack is None:
+                return
+            try:
+                self.ws.send(ack)
+            except Exception:
+                return
+
+class Track:
+    """Uma pista: a sua ESP32, o estado do jogo e os clientes, isolados das demais
+
+    Cada pista tem o próprio SerialManager (threads leitora e escritora e
+    filas), a própria thread de processamento de telemetria e o seu estado,
+    cache, stream, histórico e cronometragem. Nenhum lock é compartilhado
+    entre pistas, então uma placa lenta ou travada não atrasa as outras, e o
+    custo cresce linearmente: três threads bloqueadas em filas por pista.
+    """
+    
+    def __init__(self, track_id, num_cars):
+        self.id = track_id
+        self.serial_manager = SerialManager(track_id)
+        self.game_state = {
+            'status': 'stopped',
+            'start_time': None,
+            'winner': None
+        }
+        self.cars = CarStateTable(num_cars)  # Estado dos carros (1..N)
+        self.speed_config = dict(SPEED_CONFIG)
+        self.broadcaster = TelemetryBroadcaster()  # Stream de telemetria
+        self.state_cache = StateCache()  # Versão do estado e respostas em cache
+        self.history = TelemetryHistory(num_cars)  # Histórico de telemetria (memória fixa)
+        self.lap_timer = LapTimer(num_cars)  # Cronometragem de voltas
+        self.snapshot = None  # Estado em memória compartilhada (criado em start)
+        self._thread = None
+    
+    def start(self):
+        """Cria o snapshot compartilhado e inicia a thread de telemetria da pista"""
+        if self._thread is None:
+            snapshot = None
+            try:
+                snapshot = SnapshotWriter(self.id, self.cars.num_cars)
+                snapshot.write(self.cars, self.game_state['status'], self.game_state['winner'])
+                self.snapshot = snapshot  # Só publicado depois da primeira escrita
+            except Exception as e:
+                # Sem /dev/shm (alguns contêineres) o servidor segue só com HTTP
+                logger.warning(f"Snapshot compartilhado indisponível na pista {self.id}: {e}")
+                if snapshot is not None:
+                    snapshot.close()
+            self._thread = threading.Thread(
+                target=self.process_telemetry, name=f'telemetry-{self.id}', daemon=True
+            )
+            self._thread.start()
+    
+    def apply_command_state(self, command):
+        """Aplica ao estado do jogo os efeitos de GO e RESET"""
+        if command == 'g':  # GO
+            self.start_race()
+            logger.info(f"Jogo iniciado na pista {self.id}")
+        elif command == 'r':  # RESET
+            self.reset_race()
+            logger.info(f"Jogo resetado na pista {self.id}")
+        else:
+            return
+        self.publish_state()
+    
+    def start_race(self):
+        """Marca a corrida como iniciada"""
+        self.game_state['status'] = 'running'
+        self.game_state['start_time'] = datetime.now()
+        self.game_state['winner'] = None
+        self.lap_timer.start()
+    
+    def reset_race(self):
+        """Para a corrida e zera os carros"""
+        self.game_state['status'] = 'stopped'
+        self.game_state['start_time'] = None
+        self.game_state['winner'] = None
+        # Resetar posições dos carros
+        self.cars.reset()
+        self.lap_timer.reset()
+    
+    def game_state_view(self):
+        """Estado do jogo em formato JSON, com a visão atual dos carros"""
+        return dict(self.game_state, cars=self.cars.to_json())
+    
+    def write_snapshot(self):
+        """Copia o estado atual para a memória compartilhada (ver state_snapshot.py)"""
+        if self.snapshot:
+            self.snapshot.write(self.cars, self.game_state['status'], self.game_state['winner'])
+    
+    def publish_state(self):
+        """Publica o estado atual do jogo no stream de telemetria"""
+        self.write_snapshot()
+        self.state_cache.bump()
+        self.broadcaster.publish({
+            'track': self.id,
+            'cars': self.cars.to_json(),
+            'game_status': self.game_state['status'],
+            'winner': self.game_state['winner'],
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    def status_view(self, version):
+        """Status da conexão e do jogo"""
+        serial_manager = self.serial_manager
+        return {
+            'track': self.id,
+            'connected': serial_manager.connected,
+            'reconnecting': serial_manager.reconnecting,
+            'port': serial_manager.port,
+            'recording': serial_manager.recorder.path if serial_manager.recorder else None,
+            'game_state': self.game_state_view(),
+            'speed_config': self.speed_config,
+            'version': version,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def telemetry_view(self, version):
+        """Telemetria atual dos carros"""
+        return {
+            'track': self.id,
+            'cars': self.cars.to_json(),
+            'game_status': self.game_state['status'],
+            'version': version,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def summary(self):
+        """Resumo da pista para a listagem /api/tracks"""
+        return {
+            'id': self.id,
+            'connected': self.serial_manager.connected,
+            'reconnecting': self.serial_manager.reconnecting,
+            'port': self.serial_manager.port,
+            'game_status': self.game_state['status'],
+            'cars': self.cars.num_cars,
+            'subscribers': self.broadcaster.subscribers
+        }
+    
+    def apply_event(self, event):
+        """Aplica um evento do firmware ao estado do jogo
+        
+        Retorna True se o estado mudou e precisa ser publicado.
+        """
+        cars = self.cars
+        if isinstance(event, TelemetryFrame):
+            cars.apply_samples(event.cars)
+        elif isinstance(event, LapCompleted):
+            logger.info("🏁 Pista %s: Carro %d completou volta %d/%d",
+                        self.id, event.car, event.lap, event.total_laps)
+            self.lap_timer.lap_completed(event.car, event.lap)
+            return cars.update(event.car, laps=event.lap, speed=event.speed)
+        elif isinstance(event, CarStatus):
+            return cars.update(event.car, position=event.position, speed=event.speed, laps=event.laps)
+        elif isinstance(event, SpeedChanged):
+            return cars.update(event.car, speed=event.speed)
+        elif isinstance(event, LegacyTelemetry):
+            # Formato antigo: p1T1,50,100
+            logger.debug("Carro %d: L%d, P%d, B%d", event.car, event.lap, event.position, event.battery)
+            return cars.update(event.car, position=event.position, laps=event.lap,
+                               battery=event.battery)
+        elif isinstance(event, Winner):
+            self.game_state['winner'] = event.car
+            logger.info(f"🏆 Pista {self.id}: Vencedor Carro {event.car}")
+        elif isinstance(event, RaceFinished):
+            self.game_state['status'] = 'finished'
+            self.lap_timer.finish()
+        elif isinstance(event, RaceStarted):
+            # Sempre reiniciar: um GO de outro front-end (broker) zera as voltas no firmware
+            self.start_race()
+        elif isinstance(event, RaceReset):
+            self.reset_race()
+        else:
+            return False
+        return True
+    
+    def process_telemetry(self):
+        """Processa telemetria recebida do ESP32 (thread da pista)"""
+        serial_manager = self.serial_manager
+        parser = LineParser()
+        dirty = False
+        online = False
+        last_publish = 0.0
+        while True:
+            try:
+                # Queda ou retorno da conexão também é uma mudança de estado
+                if serial_manager.connected != online:
+                    online = serial_manager.connected
+                    self.publish_state()
+                if not online:
+                    time.sleep(0.1)
+                    continue
+                
+                batch = serial_manager.read_telemetry()
+                started = time.perf_counter()
+                changed = False
+                for event in parser.parse_batch(batch):
+                    TELEMETRY_EVENTS.inc(1, self.id, type(event).__name__)
+                    try:
+                        if self.apply_event(event):
+                            changed = True
+                    except Exception as e:
+                        TELEMETRY_ERRORS.inc(1, self.id)
+                        logger.warning(f"Erro ao processar telemetria: {e}")
+                if changed:
+                    # Leitores locais recebem cada lote; o stream é agrupado abaixo
+                    self.write_snapshot()
+                    dirty = True
+                if batch:
+                    TELEMETRY_BATCH.observe(time.perf_counter() - started, self.id)
+                
+                self.history.record(self.cars, time.time())
+                
+                # Agrupar rajadas de telemetria em uma única publicação
+                now = time.monotonic()
+                if dirty and (not batch or now - last_publish >= STREAM_MIN_INTERVAL):
+                    self.publish_state()
+                    dirty = False
+                    last_publish = now
+                
+            except Exception as e:
+                logger.error(f"Erro no processamento de telemetria: {e}")
+                time.sleep(1)
+
+class TrackPool:
+    """Pistas ativas por id; uma pista nova entra no conjunto ao conectar"""
+    
+    def __init__(self, num_cars):
+        self.num_cars = num_cars
+        self._tracks = {}
+        self._lock = threading.Lock()
+        self._started = False
+    
+    def get(self, track_id):
+        return self._tracks.get(track_id)
+    
+    def build(self, track_id):
+        """Nova pista ainda fora do conjunto (ValueError se o id for inválido ou o limite estourar)"""
+        if not TRACK_ID.match(track_id):
+            raise ValueError(f"Id de pista inválido: {track_id}")
+        if len(self._tracks) >= MAX_TRACKS:
+            raise ValueError(f"Máximo de {MAX_TRACKS} pistas")
+        return Track(track_id, self.num_cars)
+    
+    def add(self, track):
+        """Inclui a pista no conjunto; False se o id já pertence a outra pista ou não há vaga"""
+        with self._lock:
+            current = self._tracks.get(track.id)
+            if current is not None:
+                return current is track
+            if len(self._tracks) >= MAX_TRACKS:
+                return False
+            self._tracks[track.id] = track
+            started = self._started
+        if started:
+            track.start()
+        logger.info(f"🛤️ Pista {track.id} adicionada")
+        return True
+    
+    def start(self):
+        """Inicia as threads de telemetria das pistas atuais e das futuras"""
+        with self._lock:
+            self._started = True
+            tracks = list(self._tracks.values())
+        for track in tracks:
+            track.start()
+    
+    def __iter__(self):
+        return iter(list(self._tracks.values()))
+
+# Enumeração de portas compartilhada pelas pistas (atualizada quando /dev muda)
+port_cache = PortCache()
+
+# Instância global das pistas
+tracks = TrackPool(configured_num_cars())
+
+# Pista padrão: atendida pelas rotas /api/... sem id de pista
+default_track = Track(DEFAULT_TRACK, tracks.num_cars)
+tracks.add(default_track)
+serial_manager = default_track.serial_manager
+
+# Métricas lidas na exportação
+REGISTRY.callback(
+    'autorama_queue_depth', 'Itens aguardando em cada fila',
+    lambda: {
+        (track.id, name): depth
+        for track in tracks
+        for name, depth in (
+            ('inbox', track.serial_manager._inbox.qsize()),
+            ('outbox', track.serial_manager._outbox.qsize()),
+            ('pending_echo', len(track.serial_manager._pending)),
+        )
+    },
+    labelnames=('track', 'queue'))
+REGISTRY.callback('autorama_stream_subscribers', 'Clientes conectados em /api/stream',
+                  lambda: {(track.id,): track.broadcaster.subscribers for track in tracks},
+                  labelnames=('track',))
+REGISTRY.callback('autorama_serial_connected', 'Conexão serial ativa (1) ou não (0)',
+                  lambda: {(track.id,): int(track.serial_manager.connected) for track in tracks},
+                  labelnames=('track',))
+REGISTRY.callback(
+    'autorama_log_discarded_total', 'Registros de log descartados por motivo',
+    lambda: {(reason,): count for reason, count in pipeline_stats().items()},
+    kind='counter', labelnames=('reason',))
+
+def track_route(rule, create=False, **options):
+    """Registra a rota na pista padrão (/api<rule>) e em /api/tracks/<id><rule>
+    
+    A view recebe a Track como primeiro argumento. Com create=True uma pista
+    desconhecida chega nova, fora do conjunto, e a view decide se a inclui
+    (usado ao conectar); senão a resposta é 404.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(track_id=DEFAULT_TRACK, **kwargs):
+            track = tracks.get(track_id)
+            if track is None and create:
+                try:
+                    track = tracks.build(track_id)
+                except ValueError as e:
+                    return jsonify({'success': False, 'error': str(e)}), 400
+            if track is None:
+                return jsonify({'success': False, 'error': f'Pista não encontrada: {track_id}'}), 404
+            return view(track, **kwargs)
+        app.add_url_rule(f'/api{rule}', view_func=wrapper, **options)
+        app.add_url_rule(f'/api/tracks/<track_id>{rule}', view_func=wrapper, **options)
+        return wrapper
+    return decorator
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    """Latência por rota (o modelo da rota, para não criar uma série por URL)"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'desconhecida'
+        HTTP_LATENCY.observe(time.perf_counter() - started, request.method, route)
+    return response
 
 # Rotas da API
 @app.route('/')
@@ -213,28 +1171,53 @@ def serve_static(filename):
         logger.error(f"Erro ao servir arquivo {filename}: {e}")
         return f"Arquivo não encontrado: {filename}", 404
 
-@app.route('/api/status')
-def get_status():
-    """Retorna status da conexão e do jogo"""
+def cached_response(track, name, build):
+    """Resposta JSON da visão em cache, com ETag/304 e long-poll via ?since=
+    
+    Com If-None-Match igual à versão atual a resposta é um 304 sem corpo.
+    Com ?since=<cursor> a requisição espera até LONG_POLL_TIMEOUT por uma
+    versão mais nova e responde 304 se nada mudou; um cursor de outro boot
+    (servidor reiniciado) ou à frente da versão atual recebe o estado na hora.
+    """
+    state_cache = track.state_cache
+    since = request.args.get('since')
+    if since is not None:
+        version = state_cache.parse(since)
+        if version is not None and state_cache.wait_newer(version, LONG_POLL_TIMEOUT) <= version:
+            return Response(status=304, headers={'X-State-Version': since})
+    
+    tag, body = state_cache.render(name, build)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(tag)
+    response.headers['X-State-Version'] = tag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/tracks')
+def list_tracks():
+    """Lista as pistas e o estado da conexão de cada uma"""
     return jsonify({
-        'connected': serial_manager.connected,
-        'port': serial_manager.port,
-        'game_state': GAME_STATE,
-        'speed_config': SPEED_CONFIG,
+        'tracks': [track.summary() for track in tracks],
+        'max_tracks': MAX_TRACKS,
         'timestamp': datetime.now().isoformat()
     })
 
+@track_route('/status')
+def get_status(track):
+    """Retorna status da conexão e do jogo"""
+    return cached_response(track, 'status', track.status_view)
+
 @app.route('/api/ports')
 def get_ports():
-    """Lista portas seriais disponíveis"""
-    ports = serial_manager.list_ports()
+    """Lista portas seriais disponíveis (?refresh=1 força nova enumeração)"""
+    ports = serial_manager.list_ports(refresh=request.args.get('refresh') == '1')
     return jsonify({
         'ports': ports,
         'count': len(ports)
     })
 
-@app.route('/api/connect', methods=['POST'])
-def connect_serial():
+@track_route('/connect', create=True, methods=['POST'])
+def connect_serial(track):
     """Conecta a uma porta serial"""
     try:
         data = request.get_json()
@@ -243,16 +1226,27 @@ def connect_serial():
         if not port_name:
             return jsonify({'success': False, 'error': 'Porta não especificada'}), 400
         
-        if serial_manager.connect(port_name):
-            global SERIAL_PORT, SERIAL_CONNECTION, CONNECTION_STATUS
-            SERIAL_PORT = port_name
-            SERIAL_CONNECTION = serial_manager.connection
-            CONNECTION_STATUS = True
+        for other in tracks:
+            if other is not track and other.serial_manager.port == port_name:
+                return jsonify({
+                    'success': False,
+                    'error': f'Porta {port_name} já está em uso pela pista {other.id}'
+                }), 409
+        
+        if track.serial_manager.connect(port_name):
+            if not tracks.add(track):
+                track.serial_manager.disconnect()
+                return jsonify({
+                    'success': False,
+                    'error': f'Pista {track.id} criada por outra requisição ou limite de pistas atingido'
+                }), 409
+            track.publish_state()
             
             return jsonify({
                 'success': True,
                 'message': f'Conectado à porta {port_name}',
-                'port': port_name
+                'port': port_name,
+                'track': track.id
             })
         else:
             return jsonify({
@@ -267,15 +1261,12 @@ def connect_serial():
             'error': str(e)
         }), 500
 
-@app.route('/api/disconnect', methods=['POST'])
-def disconnect_serial():
+@track_route('/disconnect', methods=['POST'])
+def disconnect_serial(track):
     """Desconecta da porta serial"""
     try:
-        if serial_manager.disconnect():
-            global SERIAL_PORT, SERIAL_CONNECTION, CONNECTION_STATUS
-            SERIAL_PORT = None
-            SERIAL_CONNECTION = None
-            CONNECTION_STATUS = False
+        if track.serial_manager.disconnect():
+            track.publish_state()
             
             return jsonify({
                 'success': True,
@@ -294,8 +1285,63 @@ def disconnect_serial():
             'error': str(e)
         }), 500
 
-@app.route('/api/command', methods=['POST'])
-def send_command():
+@track_route('/recording/start', methods=['POST'])
+def start_recording(track):
+    """Começa a gravar o tráfego serial em um arquivo de captura"""
+    try:
+        data = request.get_json(silent=True) or {}
+        prefix = 'race' if track.id == DEFAULT_TRACK else f'race_{track.id}'
+        # Só um nome de arquivo: a captura fica sempre dentro de CAPTURE_DIR
+        name = data.get('name') or data.get('path') or datetime.now().strftime(
+            f'{prefix}_%Y%m%d_%H%M%S.alr')
+        if (not isinstance(name, str) or name == '.' or '..' in name
+                or any(char in name for char in '/\\\0')):
+            return jsonify({
+                'success': False,
+                'error': 'Nome de captura inválido: use apenas o nome do arquivo'
+            }), 400
+        path = os.path.join(CAPTURE_DIR, name)
+        os.makedirs(CAPTURE_DIR, exist_ok=True)
+        track.serial_manager.start_recording(path)
+        track.state_cache.bump()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Gravação iniciada',
+            'path': path
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao iniciar gravação: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@track_route('/recording/stop', methods=['POST'])
+def stop_recording(track):
+    """Encerra a gravação do tráfego serial"""
+    try:
+        path = track.serial_manager.stop_recording()
+        if path is None:
+            return jsonify({'success': False, 'error': 'Nenhuma gravação em andamento'}), 400
+        track.state_cache.bump()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Gravação encerrada',
+            'path': path
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao encerrar gravação: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@track_route('/command', methods=['POST'])
+def send_command(track):
     """Envia comando para o ESP32"""
     try:
         data = request.get_json()
@@ -304,33 +1350,21 @@ def send_command():
         if not command:
             return jsonify({'success': False, 'error': 'Comando não especificado'}), 400
         
-        if not serial_manager.connected:
+        if not track.serial_manager.connected:
             return jsonify({'success': False, 'error': 'Não conectado ao ESP32'}), 400
         
         # Processar comando especial
-        if command == 'g':  # GO
-            GAME_STATE['status'] = 'running'
-            GAME_STATE['start_time'] = datetime.now()
-            logger.info("Jogo iniciado")
-        elif command == 'r':  # RESET
-            GAME_STATE['status'] = 'stopped'
-            GAME_STATE['start_time'] = None
-            # Resetar posições dos carros
-            for car in GAME_STATE['cars'].values():
-                car['position'] = 0
-                car['speed'] = 0.0
-                car['laps'] = 0
-            logger.info("Jogo resetado")
+        track.apply_command_state(command)
         
         # Enviar comando para ESP32
-        response = serial_manager.send_command(command)
+        response = track.serial_manager.send_command(command)
         
         if response is not None:
             return jsonify({
                 'success': True,
                 'command': command,
                 'response': response,
-                'game_state': GAME_STATE
+                'game_state': track.game_state_view()
             })
         else:
             return jsonify({
@@ -345,25 +1379,78 @@ def send_command():
             'error': str(e)
         }), 500
 
-@app.route('/api/config', methods=['POST'])
-def update_config():
+@track_route('/commands', methods=['POST'])
+def send_commands(track):
+    """Envia uma lista ordenada de comandos em um único write serial"""
+    try:
+        data = request.get_json()
+        commands = data.get('commands')
+        
+        if not isinstance(commands, list) or not commands:
+            return jsonify({'success': False, 'error': 'Lista de comandos não especificada'}), 400
+        
+        if len(commands) > MAX_BATCH_COMMANDS:
+            return jsonify({
+                'success': False,
+                'error': f'Máximo de {MAX_BATCH_COMMANDS} comandos por requisição'
+            }), 400
+        
+        if not all(isinstance(command, str) and command.strip() for command in commands):
+            return jsonify({'success': False, 'error': 'Comandos devem ser textos não vazios'}), 400
+        
+        serial_manager = track.serial_manager
+        if not serial_manager.connected:
+            return jsonify({'success': False, 'error': 'Não conectado ao ESP32'}), 400
+        
+        for command in commands:
+            track.apply_command_state(command)
+        
+        futures = serial_manager.submit_many(commands)
+        if futures is None:
+            return jsonify({
+                'success': False,
+                'error': 'Falha na comunicação com ESP32'
+            }), 500
+        
+        results = [
+            {'command': command, 'response': serial_manager.wait_response(future)}
+            for command, future in zip(commands, futures)
+        ]
+        
+        return jsonify({
+            'success': all(result['response'] is not None for result in results),
+            'results': results,
+            'game_state': track.game_state_view()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao enviar comandos: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@track_route('/config', methods=['POST'])
+def update_config(track):
     """Atualiza configurações de velocidade"""
     try:
         data = request.get_json()
+        speed_config = track.speed_config
         
         # Atualizar configurações
         if 'acceleration_rate' in data:
-            SPEED_CONFIG['acceleration_rate'] = float(data['acceleration_rate'])
+            speed_config['acceleration_rate'] = float(data['acceleration_rate'])
         if 'max_speed' in data:
-            SPEED_CONFIG['max_speed'] = float(data['max_speed'])
+            speed_config['max_speed'] = float(data['max_speed'])
         if 'initial_speed' in data:
-            SPEED_CONFIG['initial_speed'] = float(data['initial_speed'])
+            speed_config['initial_speed'] = float(data['initial_speed'])
         
-        logger.info(f"Configurações atualizadas: {SPEED_CONFIG}")
+        logger.info(f"Configurações da pista {track.id} atualizadas: {speed_config}")
+        track.state_cache.bump()
         
         return jsonify({
             'success': True,
-            'config': SPEED_CONFIG,
+            'config': speed_config,
             'message': 'Configurações atualizadas'
         })
         
@@ -374,15 +1461,98 @@ def update_config():
             'error': str(e)
         }), 500
 
-@app.route('/api/telemetry')
-def get_telemetry():
+@track_route('/telemetry')
+def get_telemetry(track):
     """Retorna telemetria atual dos carros"""
+    return cached_response(track, 'telemetry', track.telemetry_view)
+
+@track_route('/telemetry/history')
+def get_telemetry_history(track):
+    """Retorna o histórico de telemetria de um carro ou de todos
+    
+    Parâmetros: car (1..N, opcional), since/until (segundos desde a época)
+    e step (intervalo mínimo entre pontos, em segundos).
+    """
+    try:
+        car = request.args.get('car', type=int)
+        since = request.args.get('since', type=float)
+        until = request.args.get('until', type=float)
+        step = request.args.get('step', type=float)
+        
+        if car is not None and car not in track.cars:
+            return jsonify({'success': False, 'error': f'Carro inválido: {car}'}), 400
+        if step is not None and step < 0:
+            return jsonify({'success': False, 'error': 'step deve ser positivo'}), 400
+        
+        return jsonify({
+            'cars': track.history.query(car, since, until, step),
+            'since': since,
+            'until': until,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao consultar histórico: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@track_route('/leaderboard')
+def get_leaderboard(track):
+    """Retorna a classificação com tempos de volta e diferença para o líder"""
+    lap_timer = track.lap_timer
+    now = time.monotonic()
+    fastest = lap_timer.fastest_lap()
+    race_time = lap_timer.race_time(now)
     return jsonify({
-        'cars': GAME_STATE['cars'],
-        'game_status': GAME_STATE['status'],
+        'game_status': track.game_state['status'],
+        'race_time': round(race_time, 3) if race_time is not None else None,
+        'standings': lap_timer.standings(now),
+        'fastest_lap': {'car': fastest[0], 'time': round(fastest[1], 3)} if fastest else None,
         'timestamp': datetime.now().isoformat()
     })
 
+@track_route('/stream')
+def stream_telemetry(track):
+    """Stream de telemetria em tempo real (Server-Sent Events)"""
+    return Response(
+        track.broadcaster.stream(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+def player_channel(ws, car_num, track_id=DEFAULT_TRACK):
+    """Canal WebSocket de aceleração de um jogador"""
+    track = tracks.get(track_id)
+    if track is None:
+        ws.close(reason=1008, message='Pista inválida')
+        return
+    if car_num not in CAR_COMMANDS:
+        ws.close(reason=1008, message='Carro inválido')
+        return
+    logger.info(f"🎮 Canal do jogador {car_num} aberto (pista {track.id})")
+    try:
+        PlayerChannel(ws, car_num, track.serial_manager).run()
+    finally:
+        logger.info(f"🎮 Canal do jogador {car_num} fechado (pista {track.id})")
+
+if sock:
+    sock.route('/api/ws/player/<int:car_num>')(player_channel)
+    sock.route('/api/tracks/<track_id>/ws/player/<int:car_num>', endpoint='track_player_channel')(player_channel)
+
+@app.route('/metrics')
+def get_metrics():
+    """Métricas no formato texto do Prometheus"""
+    try:
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        logger.error(f"Erro ao exportar métricas: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/test')
 def test_connection():
     """Testa conexão com o servidor"""
@@ -393,43 +1563,6 @@ def test_connection():
         'version': '1.0.0'
     })
 
-# Função para processar telemetria em background
-def process_telemetry():
-    """Processa telemetria recebida do ESP32"""
-    while True:
-        try:
-            if serial_manager.connected:
-                data = serial_manager.read_telemetry()
-                if data:
-                    # Processar telemetria no formato: p1T1,50,100
-                    if data.startswith('p') and 'T' in data:
-                        try:
-                            parts = data.split('T')
-                            car_num = int(parts[0][1:])  # p1 -> 1
-                            telemetry_parts = parts[1].split(',')
-                            
-                            if len(telemetry_parts) >= 3:
-                                lap = int(telemetry_parts[0])
-                                position = int(telemetry_parts[1])
-                                battery = int(telemetry_parts[2])
-                                
-                                if car_num in GAME_STATE['cars']:
-                                    GAME_STATE['cars'][car_num].update({
-                                        'position': position,
-                                        'laps': lap,
-                                        'last_update': datetime.now().isoformat()
-                                    })
-                                    
-                                    logger.debug(f"Carro {car_num}: L{lap}, P{position}, B{battery}")
-                        except Exception as e:
-                            logger.warning(f"Erro ao processar telemetria: {e}")
-            
-            time.sleep(0.1)  # 100ms entre verificações
-            
-        except Exception as e:
-            logger.error(f"Erro no processamento de telemetria: {e}")
-            time.sleep(1)
-
 # Inicialização
 def init_server():
     """Inicializa o servidor"""
@@ -445,6 +1578,9 @@ def init_server():
     logger.info("✅ Servidor Flask configurado")
     logger.info("✅ Gerenciador serial inicializado")
     
+    default_track.publish_state()
+    logger.info("✅ Stream de telemetria disponível em /api/stream")
+    
     return True
 
 # Inicializar servidor
@@ -453,23 +1589,27 @@ if __name__ == '__main__':
         sys.exit(1)
     
     try:
-        # Iniciar processamento de telemetria em background
-        import threading
-        telemetry_thread = threading.Thread(target=process_telemetry, daemon=True)
-        telemetry_thread.start()
-        
-        logger.info("🚀 Servidor iniciado em http://localhost:8000")
-        logger.info("🌐 Interface web disponível em http://localhost:8000/web_interface.html")
-        logger.info("📡 API disponível em http://localhost:8000/api/")
+        # Iniciar processamento de telemetria em background (uma thread por pista)
+        tracks.start()
+        
+        logger.info(f"🚀 Servidor iniciado em http://localhost:{SERVER_PORT}")
+        logger.info(f"🌐 Interface web disponível em http://localhost:{SERVER_PORT}/web_interface.html")
+        logger.info(f"📡 API disponível em http://localhost:{SERVER_PORT}/api/")
+        logger.info(f"📺 Telemetria ao vivo em http://localhost:{SERVER_PORT}/api/stream")
+        logger.info(f"🛤️ Outras pistas em http://localhost:{SERVER_PORT}/api/tracks/<id>/...")
         logger.info("🛑 Pressione Ctrl+C para parar")
         
         # Executar servidor Flask
-        app.run(host='0.0.0.0', port=8000, debug=False)
+        app.run(host='0.0.0.0', port=SERVER_PORT, debug=False, threaded=True)
         
     except KeyboardInterrupt:
         logger.info("\n🛑 Servidor parado pelo usuário")
-        if serial_manager.connected:
-            serial_manager.disconnect()
+        for track in tracks:
+            track.serial_manager.stop_recording()
+            if track.serial_manager.port:
+                track.serial_manager.disconnect()
+            if track.snapshot:
+                track.snapshot.close()
         logger.info("👋 Até logo!")
     except Exception as e:
         logger.error(f"❌ Erro fatal: {e}")